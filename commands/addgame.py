@@ -1,51 +1,105 @@
 import discord
 from discord.ext import commands
-import asyncio
-from utils.db import execute_query, fetch_query
-from utils.elo import calculate_new_ratings
-from utils.role_update import update_player_roles
+from utils.db import async_execute_query, transaction
+from utils.elo import calculate_new_ratings, player1_score
+from utils.rank_index import index_player
+from utils.player_cache import get_player, invalidate_players
+from utils.role_queue import snapshot_ranked_roles, queue_rank_changes
 import logging
-from utils.decorators import command_in_progress, active_commands
+from utils.decorators import command_in_progress
+from utils.members import resolve_player_name, resolve_member
+from utils.wizard import (
+    register_wizard, create_session, advance_session, add_to_session_list, end_session, wizard_buttons, wizard_modal
+)
+
+
+# Seconds each wizard step waits for a click
+STEP_TIMEOUT = 60
+CONFIRMATION_TIMEOUT = 120
 
 
 class AddGame(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        register_wizard('addgame', self.handle_step, self.handle_expiry)
 
-    async def fetch_player_data(self, query, params):
-        """Helper function to fetch a single player's data."""
-        result = fetch_query(query, params)
-        if not result:
-            return None
-        return result[0]
+    async def fetch_player_data(self, guild_id, discord_user_id=None, player_name=None):
+        """Helper function to fetch a single player's data, served from the player cache."""
+        return await get_player(guild_id, discord_user_id=discord_user_id, player_name=player_name)
 
-    async def get_reaction(self, ctx, message, options, timeout=60):
-        """Helper function to get a reaction from a user."""
-        def check(reaction, user):
-            return user == ctx.author and str(reaction.emoji) in options and reaction.message.id == message.id
+    async def record_game(self, guild_id, invoker_id, opponent_id, player_color, result):
+        """
+        Applies a confirmed game as one unit of work: both players' new ELO and
+        W/L/D counters, the game row and its rating ledger rows are pipelined and
+        committed together.
+        Returns the new game's ID and the new ELO of the invoker and the opponent.
+
+        Both player rows are locked (lowest player_id first) before their ELO is read,
+        so concurrent games sharing a player are applied one after the other instead of
+        overwriting each other, and two games can never deadlock on the same pair.
+        """
+        invoker_score = player1_score(result, player_color)
+        opponent_score = 1 - invoker_score
+
+        async with transaction() as tx:
+            ratings = await tx.fetch(
+                """
+                SELECT player_id, elo FROM players
+                WHERE player_id IN (%s, %s) AND guild_id = %s
+                ORDER BY player_id
+                FOR UPDATE
+                """,
+                (invoker_id, opponent_id, guild_id)
+            )
+            elos = {row['player_id']: row['elo'] for row in ratings}
 
-        try:
-            reaction, _ = await self.bot.wait_for('reaction_add', timeout=timeout, check=check)
-            return str(reaction.emoji)
-        except asyncio.TimeoutError:
-            await ctx.send("You took too long to respond. Please try again.")
-            return None
+            new_invoker_elo, new_opponent_elo = calculate_new_ratings(
+                elos[invoker_id], elos[opponent_id], invoker_score, opponent_score
+            )
 
-    async def get_confirmations(self, ctx, message, participants, timeout=120):
-        """Helper function to wait for confirmations from participants."""
-        confirmed_players = set()
+            for player_id, new_elo, score in (
+                (invoker_id, new_invoker_elo, invoker_score),
+                (opponent_id, new_opponent_elo, opponent_score),
+            ):
+                await tx.execute(
+                    """
+                    UPDATE players
+                    SET elo = %s, wins = wins + %s, losses = losses + %s, draws = draws + %s,
+                        games_played = games_played + 1, last_updated = NOW()
+                    WHERE player_id = %s
+                    """,
+                    (new_elo, int(score == 1), int(score == 0), int(score == 0.5), player_id)
+                )
 
-        def check(reaction, user):
-            return str(reaction.emoji) == '✅' and reaction.message.id == message.id and user.id in participants
+            # Record the game together with its ledger rows so it can be reverted later without a replay
+            ledger = await tx.fetch(
+                """
+                WITH new_game AS (
+                    INSERT INTO games (player1_id, player2_id, player1_color, result, guild_id)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING game_id, guild_id
+                )
+                INSERT INTO rating_ledger
+                    (game_id, guild_id, player_id, elo_before, elo_after, wins_delta, losses_delta, draws_delta)
+                SELECT new_game.game_id, new_game.guild_id, v.player_id, v.elo_before, v.elo_after,
+                       v.wins_delta, v.losses_delta, v.draws_delta
+                FROM new_game, (VALUES (%s, %s, %s, %s, %s, %s), (%s, %s, %s, %s, %s, %s))
+                    AS v(player_id, elo_before, elo_after, wins_delta, losses_delta, draws_delta)
+                RETURNING game_id
+                """,
+                (
+                    invoker_id, opponent_id, player_color, result, guild_id,
+                    invoker_id, elos[invoker_id], new_invoker_elo,
+                    int(invoker_score == 1), int(invoker_score == 0), int(invoker_score == 0.5),
+                    opponent_id, elos[opponent_id], new_opponent_elo,
+                    int(opponent_score == 1), int(opponent_score == 0), int(opponent_score == 0.5),
+                )
+            )
 
-        try:
-            while len(confirmed_players) < len(participants):
-                reaction, user = await self.bot.wait_for('reaction_add', timeout=timeout, check=check)
-                confirmed_players.add(user.id)
-                await ctx.send(f"{user.mention} has confirmed the game.")
-            return True
-        except asyncio.TimeoutError:
-            return False
+        index_player(guild_id, invoker_id, new_invoker_elo)
+        index_player(guild_id, opponent_id, new_opponent_elo)
+        invalidate_players(guild_id, (invoker_id, opponent_id))
+        return ledger[0]['game_id'], new_invoker_elo, new_opponent_elo
 
     @commands.command()
     @command_in_progress()
@@ -57,10 +111,7 @@ class AddGame(commands.Cog):
         logging.info(f"AddGame invoked in guild `{guild_id}` with opponent `{opponent_name}`.")
 
         # Fetch invoker data
-        invoker_data = await self.fetch_player_data(
-            "SELECT player_name, player_id FROM players WHERE discord_user_id = %s AND guild_id = %s",
-            (ctx.author.id, guild_id)
-        )
+        invoker_data = await self.fetch_player_data(guild_id, discord_user_id=ctx.author.id)
 
         if not invoker_data:
             await ctx.send("❌ You are not registered yet. Use `!signup` to register.")
@@ -79,249 +130,239 @@ class AddGame(commands.Cog):
                 "❌ The opponent's name must be formatted like `JohnC` (capitalized first name and last initial, and no @ symbol).")
             return
 
-        # Check if the opponent exists in the database
-        opponent_data = await self.fetch_player_data(
-            "SELECT player_id, discord_user_id FROM players WHERE player_name = %s AND guild_id = %s",
-            (opponent_name, guild_id)
-        )
+        # Check if the opponent exists; names are cached, so this is usually not a query
+        opponent = await resolve_player_name(guild_id, opponent_name)
 
-        if not opponent_data:
+        if not opponent:
             await ctx.send(
                 f"❌ Opponent **{opponent_name}** does not exist or is not registered. They need to use `!signup` first.")
             return
 
         # Extract opponent details
-        opponent_id, opponent_discord_id = opponent_data['player_id'], opponent_data['discord_user_id']
+        opponent_id, opponent_discord_id = opponent
 
         # Ensure the opponent is not the invoker
         if opponent_discord_id == ctx.author.id:
             await ctx.send("❌ You cannot add a game against yourself.")
             return
 
-        # Confirm opponent is a member of the guild
+        # Confirm opponent is a member of the guild (from the member cache when possible)
         try:
-            opponent_member = await ctx.guild.fetch_member(opponent_discord_id)
-        except discord.NotFound:
-            await ctx.send(f"❌ Opponent **{opponent_name}** is not a member of this guild.")
-            return
+            opponent_member = await resolve_member(ctx.guild, opponent_discord_id)
         except discord.HTTPException:
             await ctx.send("❌ Error fetching the opponent's membership information. Please try again later.")
             return
+        if opponent_member is None:
+            await ctx.send(f"❌ Opponent **{opponent_name}** is not a member of this guild.")
+            return
 
         # Log the successful validation of the opponent
         logging.info(f"Validated opponent `{opponent_name}` with Discord ID `{opponent_discord_id}`.")
 
-        # Step 1: Get the invoker's color
-        color_embed = discord.Embed(
-            title="**Select Color**",
-            description="Please select your color:",
-            color=discord.Color.blue()
-        )
-        color_embed.add_field(name="🟥 Sente (先手)", value="--------------", inline=True)
-        color_embed.add_field(name="⬜ Gote  (後手)", value="--------------", inline=True)
-        color_message = await ctx.send(embed=color_embed)
-        await color_message.add_reaction('🟥')
-        await color_message.add_reaction('⬜')
-
-        reaction = await self.get_reaction(ctx, color_message, ['🟥', '⬜'])
-        if not reaction:
-            return
-
-        player_color = 'sente' if reaction == '🟥' else 'gote'
-
-        # Step 2: Get the game result
-        result_embed = discord.Embed(
-            title="🏁 **Game Result**",
-            description="Please select the game result:",
-            color=discord.Color.green()
+        # The wizard's state is persisted, so the command returns now and each click resumes it
+        session_id = await create_session(
+            'addgame', guild_id, ctx.author.id, 'color',
+            {
+                'invoker_id': invoker_id,
+                'invoker_discord_id': ctx.author.id,
+                'invoker_display_name': ctx.author.display_name,
+                'opponent_id': opponent_id,
+                'opponent_discord_id': opponent_discord_id,
+            },
+            STEP_TIMEOUT,
+            ctx.channel.id
         )
-        result_embed.add_field(name="🟥 1-0 (Sente Won)", value="-------------", inline=False)
-        result_embed.add_field(name="⬜ 0-1 (Gote Won)", value="-------------", inline=False)
-        result_embed.add_field(name="3️⃣ 0.5-0.5 (Draw)", value="--------------", inline=False)
-        result_message = await ctx.send(embed=result_embed)
-        await result_message.add_reaction('🟥')
-        await result_message.add_reaction('⬜')
-        await result_message.add_reaction('3️⃣')
-
-        reaction = await self.get_reaction(ctx, result_message, ['🟥', '⬜', '3️⃣'])
-        if not reaction:
+        if session_id is None:
+            await ctx.send("❌ You already have a game or signup in progress. Please finish it before starting another.")
             return
 
-        result = {'🟥': '1-0', '⬜': '0-1', '3️⃣': '0.5-0.5'}[reaction]
-
-        # Step 3: Validate Opponent
-        opponent_data = await self.fetch_player_data(
-            "SELECT player_id, discord_user_id FROM players WHERE player_name = %s AND guild_id = %s",
-            (opponent_name, guild_id)
-        )
+        # Step 1: Get the invoker's color
+        await ctx.send(embed=self.color_embed(), view=wizard_buttons(session_id, [
+            ("Sente", '🟥', 'color', 'sente'),
+            ("Gote", '⬜', 'color', 'gote'),
+        ]))
 
-        if not opponent_data:
-            await ctx.send(f"Opponent **{opponent_name}** not found.")
+    async def handle_step(self, interaction, session, action, value):
+        """
+        Resumes an addgame wizard from a button click or modal submission.
+        """
+        state = session['state']
+        session_id = session['session_id']
+        participants = (state['invoker_discord_id'], state['opponent_discord_id'])
+        allowed = participants if session['step'] == 'confirm' else participants[:1]
+        if interaction.user.id not in allowed:
+            await interaction.response.send_message("❌ These buttons are not for you.", ephemeral=True)
             return
 
-        opponent_id, opponent_discord_id = opponent_data['player_id'], opponent_data['discord_user_id']
-
-        if opponent_discord_id == ctx.author.id:
-            await ctx.send("You cannot add a game against yourself.")
-            return
+        if session['step'] == 'color' and action == 'color':
+            # Step 2: Get the game result
+            state['player_color'] = value
+            if not await advance_session(session, 'result', state, STEP_TIMEOUT):
+                await interaction.response.defer()  # Another click already moved the wizard on
+                return
+            await interaction.response.edit_message(embed=self.result_embed(), view=wizard_buttons(session_id, [
+                ("1-0", '🟥', 'result', '1-0'),
+                ("0-1", '⬜', 'result', '0-1'),
+                ("0.5-0.5", '3️⃣', 'result', '0.5-0.5'),
+            ]))
+
+        elif session['step'] == 'result' and action == 'result':
+            # Step 3: Both players confirm the game details
+            state['result'] = value
+            state['confirmed'] = []
+            if not await advance_session(session, 'confirm', state, CONFIRMATION_TIMEOUT):
+                await interaction.response.defer()  # Another click already moved the wizard on
+                return
+            confirmation_embed = discord.Embed(
+                title="✅ **Game Confirmation**",
+                description=(
+                    f"**Players:** <@{state['invoker_discord_id']}> vs <@{state['opponent_discord_id']}>\n"
+                    f"**Result:** {state['result']}\n"
+                    f"**{state['invoker_display_name']}** played **{state['player_color'].capitalize()}**"
+                ),
+                color=discord.Color.orange()
+            )
+            await interaction.response.edit_message(embed=confirmation_embed, view=None)
 
-        # Confirm opponent membership in the guild
-        try:
-            opponent_member = await ctx.guild.fetch_member(opponent_discord_id)
-        except discord.NotFound:
-            await ctx.send(f"Opponent **{opponent_name}** is not a member of this guild.")
-            return
+            # A new message, so both players are pinged with the instructions
+            await interaction.followup.send(
+                f"🔔 <@{state['invoker_discord_id']}> and <@{state['opponent_discord_id']}>, please double-check the game details above. "
+                f"If everything looks correct, press ✅ Confirm to confirm the game.",
+                view=wizard_buttons(session_id, [("Confirm", '✅', 'confirm', '', discord.ButtonStyle.success)])
+            )
 
-        # Confirm game details
-        confirmation_embed = discord.Embed(
-            title="✅ **Game Confirmation**",
-            description=(
-                f"**Players:** {ctx.author.mention} vs {opponent_member.mention}\n"
-                f"**Result:** {result}\n"
-                f"**{ctx.author.display_name}** played **{player_color.capitalize()}**"
-            ),
-            color=discord.Color.orange()
-        )
+        elif session['step'] == 'confirm' and action == 'confirm':
+            state = await add_to_session_list(session, 'confirmed', interaction.user.id)
+            if state is None:
+                await interaction.response.defer()  # Another click already moved the wizard on
+                return
+            if set(state['confirmed']) != set(participants):
+                confirmed = ", ".join(f"<@{user_id}>" for user_id in state['confirmed'])
+                await interaction.response.edit_message(content=f"✅ Confirmed by {confirmed}.")
+                return
+
+            # The game is recorded as soon as both players confirm; notes are an optional follow-up
+            if not await advance_session(session, 'recording', ttl=CONFIRMATION_TIMEOUT):
+                await interaction.response.defer()  # Another click already moved the wizard on
+                return
+            session['step'] = 'recording'
+            # Recording takes a few round trips, so acknowledge the click first
+            await interaction.response.defer()
+            game_id = await self.finish_game(interaction, session['guild_id'], state)
+            if game_id is None:
+                await end_session(session)
+                return
+
+            # Step 4: Add Notes (Optional)
+            state['game_id'] = game_id
+            if not await advance_session(session, 'notes', state, STEP_TIMEOUT):
+                await interaction.edit_original_response(content=None, embed=self.recorded_embed(None), view=None)
+                return
+            notes_embed = discord.Embed(
+                title="📝 Add Notes (0-60)",
+                description="Add any notes for the game (max 60 characters). For example, the name of the openings used.\n\nPress ❌ Skip to skip.",
+                color=discord.Color.purple()
+            )
+            await interaction.edit_original_response(
+                content="🎉 Game recorded and ELOs updated! Roles will be updated in a few seconds.",
+                embed=notes_embed, view=wizard_buttons(session_id, [
+                    ("Add notes", '📝', 'notes', '', discord.ButtonStyle.primary),
+                    ("Skip", '❌', 'skip', ''),
+                ])
+            )
 
-        confirmation_message = await ctx.send(embed=confirmation_embed)
-        await confirmation_message.add_reaction('✅')
+        elif session['step'] == 'notes' and action == 'notes':
+            await interaction.response.send_modal(wizard_modal(session_id, 'notes_text', "Add Notes", [
+                ('notes', "Notes (max 60 characters)", 60, "For example, the name of the openings used."),
+            ]))
+
+        elif session['step'] == 'notes' and action in ('notes_text', 'skip'):
+            if not await end_session(session):
+                await interaction.response.defer()  # Another click already moved the wizard on
+                return
+            notes = (value.get('notes', '').strip() or None) if action == 'notes_text' else None
+            if notes:
+                await async_execute_query(
+                    "UPDATE games SET note = %s WHERE game_id = %s AND guild_id = %s",
+                    (notes, state['game_id'], session['guild_id'])
+                )
+            await interaction.response.edit_message(content=None, embed=self.recorded_embed(notes), view=None)
 
-        # Ping both players with instructions
-        await ctx.send(
-            f"🔔 {ctx.author.mention} and {opponent_member.mention}, please double-check the game details above. "
-            f"If everything looks correct, react to the confirmation message with ✅ to confirm the game."
-        )
+        else:
+            # A click on a step the session has already moved past
+            await interaction.response.defer()
 
-        if not await self.get_confirmations(ctx, confirmation_message, [ctx.author.id, opponent_discord_id]):
-            await ctx.send("❌ Confirmation timed out. Please try again.")
+    async def handle_expiry(self, session):
+        """
+        Tells the players that an addgame wizard timed out. A game that reached the
+        notes step has already been recorded, so only its notes are skipped.
+        """
+        channel = self.bot.get_channel(session['channel_id']) if session['channel_id'] else None
+        if channel is None:
             return
+        invoker = f"<@{session['state']['invoker_discord_id']}>"
+        if session['step'] == 'notes':
+            await channel.send(f"⏳ {invoker}, you took too long to respond. Skipping notes.")
+        elif session['step'] == 'confirm':
+            await channel.send(f"❌ {invoker}, confirmation timed out. The game was not recorded; please try again.")
+        elif session['step'] != 'recording':
+            await channel.send(f"⏳ {invoker}, you took too long to respond. Please try again.")
+
+    async def finish_game(self, interaction, guild_id, state):
+        """
+        Records a confirmed game and queues the role updates it causes.
+        Returns the game's ID, or None if it could not be recorded.
+        """
+        invoker_id, opponent_id = state['invoker_id'], state['opponent_id']
 
-        # Update ELOs and record game
-        invoker_stats = fetch_query(
-            "SELECT elo FROM players WHERE player_id = %s",
-            (invoker_id,)
-        )[0]
-        opponent_stats = fetch_query(
-            "SELECT elo FROM players WHERE player_id = %s",
-            (opponent_id,)
-        )[0]
-
-        new_invoker_elo, new_opponent_elo = calculate_new_ratings(
-            invoker_stats['elo'], opponent_stats['elo'],
-            1 if result == '1-0' else 0.5 if result == '0.5-0.5' else 0,
-            0 if result == '1-0' else 0.5 if result == '0.5-0.5' else 1
-        )
-
-        execute_query(
-            "UPDATE players SET elo = %s, last_updated = NOW() WHERE player_id = %s",
-            (new_invoker_elo, invoker_id)
-        )
-        execute_query(
-            "UPDATE players SET elo = %s, last_updated = NOW() WHERE player_id = %s",
-            (new_opponent_elo, opponent_id)
-        )
-
-        # Update win/loss/draw statistics and increment games played
-        if result == '1-0':  # Sente won
-            execute_query(
-                "UPDATE players SET wins = wins + 1, games_played = games_played + 1 WHERE player_id = %s",
-                (invoker_id if player_color == 'sente' else opponent_id,)
-            )
-            execute_query(
-                "UPDATE players SET losses = losses + 1, games_played = games_played + 1 WHERE player_id = %s",
-                (opponent_id if player_color == 'sente' else invoker_id,)
-            )
-        elif result == '0-1':  # Gote won
-            execute_query(
-                "UPDATE players SET wins = wins + 1, games_played = games_played + 1 WHERE player_id = %s",
-                (opponent_id if player_color == 'sente' else invoker_id,)
-            )
-            execute_query(
-                "UPDATE players SET losses = losses + 1, games_played = games_played + 1 WHERE player_id = %s",
-                (invoker_id if player_color == 'sente' else opponent_id,)
-            )
-        elif result == '0.5-0.5':  # Draw
-            execute_query(
-                "UPDATE players SET draws = draws + 1, games_played = games_played + 1 WHERE player_id = %s",
-                (invoker_id,)
+        # Update ELOs, W/L/D counters and record the game in a single transaction
+        ranked_roles_before = await snapshot_ranked_roles(guild_id)
+        try:
+            game_id, _, _ = await self.record_game(
+                guild_id, invoker_id, opponent_id, state['player_color'], state['result']
             )
-            execute_query(
-                "UPDATE players SET draws = draws + 1, games_played = games_played + 1 WHERE player_id = %s",
-                (opponent_id,)
+        except Exception as e:
+            logging.error(f"Failed to record game between players {invoker_id} and {opponent_id}: {e}")
+            await interaction.edit_original_response(
+                content="❌ An unexpected error occurred while recording the game. Please try again later.",
+                embed=None, view=None
             )
+            return None
 
-        # Fetch all players in the guild sorted by ELO
-        players = fetch_query(
-            "SELECT player_id FROM players WHERE guild_id = %s ORDER BY elo DESC",
-            (guild_id,)
-        )
-
-        # Compute ranks
-        rankings = {player['player_id']: rank + 1 for rank, player in enumerate(players)}
-
-        # Update roles for both players
-        if invoker_id in rankings:
-            await update_player_roles(ctx.author, new_invoker_elo, rankings[invoker_id])
-
-        if opponent_id in rankings:
-            opponent_member = ctx.guild.get_member(opponent_discord_id)
-            if opponent_member:
-                await update_player_roles(opponent_member, new_opponent_elo, rankings[opponent_id])
+        # Queue role updates for both players and anyone the game pushed across a rank boundary
+        await queue_rank_changes(interaction.guild, ranked_roles_before, [invoker_id, opponent_id])
+        return game_id
 
-        # Step 3: Add Notes (Optional)
-        notes_embed = discord.Embed(
-            title="📝 Add Notes (0-60)",
-            description="Enter any notes for the game (max 60 characters). For example, the name of the openings used.\n\nReact with ❌ to skip.",
-            color=discord.Color.purple()
+    def recorded_embed(self, notes):
+        return discord.Embed(
+            title="🎉 **Game Recorded**",
+            description=(
+                "Game recorded and ELOs updated! Roles will be updated in a few seconds.\n\n"
+                + (f"📝 Notes added: {notes}" if notes else "❌ Notes skipped.")
+            ),
+            color=discord.Color.green()
         )
-        notes_message = await ctx.send(embed=notes_embed)
-        await notes_message.add_reaction('❌')
 
-        def notes_check(m):
-            return m.author == ctx.author and m.channel == ctx.channel
-
-        def reaction_check(reaction, user):
-            return user == ctx.author and str(reaction.emoji) == '❌' and reaction.message.id == notes_message.id
-
-        notes = None  # Default value
-
-        while True:
-            try:
-                done, pending = await asyncio.wait(
-                    [
-                        self.bot.wait_for('message', timeout=60, check=notes_check),
-                        self.bot.wait_for('reaction_add', timeout=60, check=reaction_check)
-                    ],
-                    return_when=asyncio.FIRST_COMPLETED
-                )
+    def color_embed(self):
+        color_embed = discord.Embed(
+            title="**Select Color**",
+            description="Please select your color:",
+            color=discord.Color.blue()
+        )
+        color_embed.add_field(name="🟥 Sente (先手)", value="--------------", inline=True)
+        color_embed.add_field(name="⬜ Gote  (後手)", value="--------------", inline=True)
+        return color_embed
 
-                for task in pending:
-                    task.cancel()  # Cancel any pending tasks
-
-                # Check what completed first
-                if any(isinstance(task.result(), tuple) for task in done):  # Reaction was added
-                    await ctx.send("❌ Notes skipped.")
-                    notes = None
-                    break
-                else:  # User typed a message
-                    message = next(task.result() for task in done if not isinstance(task.result(), tuple))
-                    notes = message.content.strip()
-                    if len(notes) > 60:  # Character limit
-                        await ctx.send("⚠️ Notes cannot exceed 60 characters. Please try again.")
-                        continue  # Loop back to prompt again
-                    await ctx.send(f"📝 Notes added: {notes}")
-                    break
-            except asyncio.TimeoutError:
-                await ctx.send("⏳ You took too long to respond. Skipping notes.")
-                notes = None
-                break
-
-        # Insert game into the database with notes
-        execute_query(
-            "INSERT INTO games (player1_id, player2_id, player1_color, result, guild_id, note) VALUES (%s, %s, %s, %s, %s, %s)",
-            (invoker_id, opponent_id, player_color, result, guild_id, notes)
+    def result_embed(self):
+        result_embed = discord.Embed(
+            title="🏁 **Game Result**",
+            description="Please select the game result:",
+            color=discord.Color.green()
         )
-        await ctx.send("Game recorded, ELOs updated, and roles assigned!")
+        result_embed.add_field(name="🟥 1-0 (Sente Won)", value="-------------", inline=False)
+        result_embed.add_field(name="⬜ 0-1 (Gote Won)", value="-------------", inline=False)
+        result_embed.add_field(name="3️⃣ 0.5-0.5 (Draw)", value="--------------", inline=False)
+        return result_embed
 
     @addgame.error
     async def addgame_error(self, ctx, error):
@@ -2,10 +2,15 @@ import discord
 import logging
 from discord.ext import commands
 from config import ADMIN_ROLE_NAME
-from utils.db import execute_query, fetch_query
+from utils.db import async_execute_query, async_fetch_query
 from utils.elo import calculate_new_ratings
-from utils.role_update import update_player_roles
-from utils.decorators import command_in_progress, active_commands
+from utils.role_update import prewarm_roles, update_player_roles
+from utils.rank_index import get_rank_index, index_player, unindex_player
+from utils.player_cache import get_player, invalidate_players
+from utils.replay import revert_game
+from utils.role_queue import snapshot_ranked_roles, queue_rank_changes, role_update_queue
+from utils.role_config import get_role_config, invalidate_role_config
+from utils.decorators import command_in_progress
 
 
 def has_role_name(role_name):
@@ -27,18 +32,21 @@ class Admin(commands.Cog):
         guild_id = ctx.guild.id
 
         # Ensure the player exists in the current guild
-        player_data = fetch_query(
-            "SELECT player_id FROM players WHERE player_name = %s AND guild_id = %s",
-            (player_name, guild_id)
-        )
+        player_data = await get_player(guild_id, player_name=player_name)
         if not player_data:
             await ctx.send(f"Player `{player_name}` not found in this guild.")
             return
 
-        execute_query(
-            "UPDATE players SET elo = %s WHERE player_name = %s AND guild_id = %s",
-            (new_elo, player_name, guild_id)
+        ranked_roles_before = await snapshot_ranked_roles(guild_id)
+
+        # Shift the replay seed by the same amount so a later replay keeps the manual adjustment
+        await async_execute_query(
+            "UPDATE players SET elo = %s, base_elo = base_elo + (%s - elo) WHERE player_name = %s AND guild_id = %s",
+            (new_elo, new_elo, player_name, guild_id)
         )
+        index_player(guild_id, player_data['player_id'], new_elo)
+        invalidate_players(guild_id, [player_data['player_id']])
+        await queue_rank_changes(ctx.guild, ranked_roles_before, [player_data['player_id']])
         await ctx.send(f"Successfully changed {player_name}'s ELO to {new_elo}.")
 
     @commands.command()
@@ -54,24 +62,31 @@ class Admin(commands.Cog):
             f"Attempting to remove player `{player_name}` in guild `{ctx.guild.name}` (ID: {guild_id}) by admin `{user_name}`")
 
         # Check if the player exists in the guild
-        player_data = fetch_query(
-            "SELECT player_id, discord_user_id FROM players WHERE player_name = %s AND guild_id = %s",
-            (player_name, guild_id)
-        )
+        player_data = await get_player(guild_id, player_name=player_name)
         if not player_data:
             logging.warning(f"Player `{player_name}` not found in guild `{ctx.guild.name}` (ID: {guild_id})")
             await ctx.send(f"Player `{player_name}` not found in this guild.")
             return
 
-        player_id = player_data[0]["player_id"]
-        discord_user_id = player_data[0]["discord_user_id"]
+        player_id = player_data["player_id"]
+        discord_user_id = player_data["discord_user_id"]
+
+        ranked_roles_before = await snapshot_ranked_roles(guild_id)
 
         try:
             # Delete the player record, cascading will handle associated data
-            execute_query(
+            await async_execute_query(
                 "DELETE FROM players WHERE player_id = %s AND guild_id = %s",
                 (player_id, guild_id)
             )
+            unindex_player(guild_id, player_id)
+            invalidate_players(guild_id, [player_id])
+
+            # Strip the removed player's ranking roles and promote whoever moved up
+            member = ctx.guild.get_member(discord_user_id)
+            if member:
+                await update_player_roles(member, None, None, player_id)
+            await queue_rank_changes(ctx.guild, ranked_roles_before)
             logging.info(
                 f"Successfully removed player `{player_name}` (ID: {player_id}) from guild `{ctx.guild.name}` (ID: {guild_id})")
             await ctx.send(f"Successfully removed player `{player_name}` and associated data from the database.")
@@ -97,7 +112,7 @@ class Admin(commands.Cog):
         guild_id = ctx.guild.id
 
         # Check if the game exists in the current guild
-        game_data = fetch_query(
+        game_data = await async_fetch_query(
             "SELECT game_id FROM games WHERE game_id = %s AND guild_id = %s",
             (game_id, guild_id)
         )
@@ -105,9 +120,30 @@ class Admin(commands.Cog):
             await ctx.send(f"Game with ID `{game_id}` not found in this guild.")
             return
 
-        # Delete the game from the database
-        execute_query("DELETE FROM games WHERE game_id = %s AND guild_id = %s", (game_id, guild_id))
-        await ctx.send(f"Game with ID `{game_id}` has been removed.")
+        # Delete the game and revert the rating changes it caused
+        ranked_roles_before = await snapshot_ranked_roles(guild_id)
+        try:
+            _, changed_player_ids = await revert_game(guild_id, game_id)
+        except ValueError as e:
+            logging.error(f"Failed to remove game `{game_id}` from guild `{ctx.guild.name}`: {e}")
+            await ctx.send(f"Game with ID `{game_id}` could not be removed: {e}")
+            return
+        await queue_rank_changes(ctx.guild, ranked_roles_before, changed_player_ids)
+        await ctx.send(f"Game with ID `{game_id}` has been removed and ratings have been recalculated.")
+
+    @commands.command(name='reloadroles')
+    @has_role_name(ADMIN_ROLE_NAME)
+    async def reload_roles(self, ctx):
+        """Reloads the role configuration from the roles table and reapplies it to every player."""
+        guild_id = ctx.guild.id
+        invalidate_role_config(guild_id)
+        config = await get_role_config(guild_id)
+        rank_index = await get_rank_index(guild_id)
+        # Create any newly configured roles before players are moved into them
+        await prewarm_roles(ctx.guild, [player['elo'] for player in rank_index.players.values()])
+        queued = role_update_queue.enqueue(ctx.guild, list(rank_index.players), verify=True)
+        logging.info(f"Role config reloaded in guild `{ctx.guild.name}` (ID: {guild_id}) by admin `{ctx.author.name}`")
+        await ctx.send(f"Reloaded {len(config.roles)} roles. Updating roles for {queued} players.")
 
     @remove_game.error
     async def remove_game_error(self, ctx, error):
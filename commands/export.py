@@ -0,0 +1,129 @@
+import discord
+from discord.ext import commands
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import tempfile
+from utils.db import stream_query
+from utils.player_cache import get_player
+from utils.decorators import command_in_progress
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_COLUMNS = ['game_id', 'date_played', 'player1_name', 'player2_name', 'player1_color', 'result', 'note']
+EXPORT_CHUNK_SIZE = 1000
+
+
+class Export(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command()
+    @command_in_progress()
+    async def export(self, ctx, target: str = "ALL", file_format: str = "csv", compression: str = None):
+        """
+        Exports the full game history of the guild or of one player as a file attachment.
+        """
+        guild_id = ctx.guild.id
+        file_format = file_format.lower()
+
+        if file_format not in EXPORT_FORMATS:
+            await ctx.send(f"❌ Unknown format `{file_format}`. Use `csv` or `ndjson`.")
+            return
+        if compression is not None and compression.lower() != 'gzip':
+            await ctx.send(f"❌ Unknown compression `{compression}`. Use `gzip` or leave it out.")
+            return
+        use_gzip = compression is not None
+
+        if target.upper() == "ALL":
+            games_sql, params = "SELECT game_id FROM games WHERE guild_id = %s", (guild_id,)
+            file_stem = f"games_{ctx.guild.id}"
+        else:
+            player_data = await get_player(guild_id, player_name=target)
+            if not player_data:
+                await ctx.send(f"No player found with the name `{target}` in this guild.")
+                return
+            player_id = player_data['player_id']
+            # Each side of the game is its own index scan, as in !history, instead of an OR filter
+            games_sql = """
+                SELECT game_id FROM games WHERE player1_id = %s AND guild_id = %s
+                UNION ALL
+                SELECT game_id FROM games WHERE player2_id = %s AND guild_id = %s
+            """
+            params = (player_id, guild_id, player_id, guild_id)
+            file_stem = f"games_{target}"
+
+        filename = f"{file_stem}.{file_format}" + (".gz" if use_gzip else "")
+        logging.info(f"Export of `{target}` as {filename} requested in guild `{guild_id}`.")
+        await ctx.send(f"⏳ Preparing `{filename}`...")
+
+        # Rows are written chunk by chunk in a worker thread so only one chunk is ever in memory
+        fd, path = tempfile.mkstemp(suffix=f"_{filename}")
+        os.close(fd)
+        try:
+            handle = gzip.open(path, 'wt', encoding='utf-8', newline='') if use_gzip \
+                else open(path, 'w', encoding='utf-8', newline='')
+            try:
+                writer = csv.DictWriter(handle, fieldnames=EXPORT_COLUMNS) if file_format == 'csv' else None
+                if writer:
+                    await asyncio.to_thread(writer.writeheader)
+
+                row_count = 0
+                async for rows in stream_query(
+                    f"""
+                    SELECT g.game_id, g.date_played, p1.player_name AS player1_name, p2.player_name AS player2_name,
+                           g.player1_color, g.result, g.note
+                    FROM ({games_sql}) selected
+                    JOIN games g ON g.game_id = selected.game_id
+                    JOIN players p1 ON g.player1_id = p1.player_id
+                    JOIN players p2 ON g.player2_id = p2.player_id
+                    ORDER BY g.date_played, g.game_id
+                    """,
+                    params,
+                    chunk_size=EXPORT_CHUNK_SIZE
+                ):
+                    await asyncio.to_thread(self.write_chunk, handle, writer, rows)
+                    row_count += len(rows)
+            finally:
+                await asyncio.to_thread(handle.close)
+
+            if row_count == 0:
+                await ctx.send("No games found.")
+                return
+
+            if os.path.getsize(path) > ctx.guild.filesize_limit:
+                await ctx.send(
+                    f"❌ The export ({row_count} games) is larger than this server's upload limit. "
+                    "Try again with `gzip` or export a single player."
+                )
+                return
+
+            await ctx.send(
+                f"📦 Exported {row_count} games.",
+                file=discord.File(path, filename=filename)
+            )
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def write_chunk(handle, writer, rows):
+        """Writes one chunk of rows as CSV (when a writer is given) or as NDJSON."""
+        for row in rows:
+            row['date_played'] = row['date_played'].isoformat() if row['date_played'] else None
+        if writer:
+            writer.writerows(rows)
+        else:
+            handle.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    @export.error
+    async def export_error(self, ctx, error):
+        if isinstance(error, commands.BadArgument):
+            await ctx.send("❌ **Error:** Invalid argument.\n**Usage:** `!export [ALL|player_name] [csv|ndjson] [gzip]`")
+        else:
+            await ctx.send("❌ An unexpected error occurred while exporting. Please try again later.")
+            raise error
+
+async def setup(bot):
+    await bot.add_cog(Export(bot))
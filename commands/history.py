@@ -1,8 +1,173 @@
 import discord
 from discord.ext import commands
 import asyncio
-from utils.db import fetch_query
-from utils.decorators import command_in_progress, active_commands
+from datetime import datetime, timedelta
+from utils.db import async_fetch_query
+from utils.player_cache import get_player
+from utils.decorators import command_in_progress
+from utils.paginator import paginator, send_paginator
+from utils.rank_index import get_rank_index
+
+
+async def fetch_history_page(guild_id, limit, player_id=None, after=None, before=None):
+    """
+    Fetches one page of games, newest first, using a (date_played, game_id) cursor.
+    Pass the last game of the current page as `after` for older games, or its first
+    game as `before` for newer ones.
+
+    For a single player the two sides of the game are fetched as separate index range
+    scans and merged, instead of an OR filter that cannot use either index.
+    """
+    if before:
+        cursor_sql, order, cursor = "AND (date_played, game_id) > (%s, %s)", "ASC", before
+    elif after:
+        cursor_sql, order, cursor = "AND (date_played, game_id) < (%s, %s)", "DESC", after
+    else:
+        cursor_sql, order, cursor = "", "DESC", None
+    cursor_params = (cursor['date_played'], cursor['game_id']) if cursor else ()
+
+    if player_id is None:
+        page_sql = f"""
+            SELECT game_id FROM games
+            WHERE guild_id = %s {cursor_sql}
+            ORDER BY date_played {order}, game_id {order}
+            LIMIT %s
+        """
+        params = (guild_id, *cursor_params, limit)
+    else:
+        page_sql = f"""
+            (SELECT game_id, date_played FROM games
+             WHERE player1_id = %s AND guild_id = %s {cursor_sql}
+             ORDER BY date_played {order}, game_id {order}
+             LIMIT %s)
+            UNION ALL
+            (SELECT game_id, date_played FROM games
+             WHERE player2_id = %s AND guild_id = %s {cursor_sql}
+             ORDER BY date_played {order}, game_id {order}
+             LIMIT %s)
+            ORDER BY date_played {order}, game_id {order}
+            LIMIT %s
+        """
+        params = (
+            player_id, guild_id, *cursor_params, limit,
+            player_id, guild_id, *cursor_params, limit,
+            limit
+        )
+
+    games = await async_fetch_query(
+        f"""
+        SELECT g.game_id, g.date_played, p1.player_name AS player1_name, p2.player_name AS player2_name,
+               g.player1_color, g.result, g.note
+        FROM ({page_sql}) page
+        JOIN games g ON g.game_id = page.game_id
+        JOIN players p1 ON g.player1_id = p1.player_id
+        JOIN players p2 ON g.player2_id = p2.player_id
+        ORDER BY g.date_played {order}, g.game_id {order}
+        """,
+        params
+    )
+    return games[::-1] if before else games
+
+
+def build_history_page(title, games, page_number, has_next):
+    """
+    Renders one page of games as an embed.
+    """
+    embed = discord.Embed(title=title, color=discord.Color.blue())
+    for game in games:
+        game_id = game['game_id']
+        timestamp = game['date_played'].strftime('%Y-%m-%d') if game['date_played'] else 'Unknown'
+        player1_name = game['player1_name']
+        player2_name = game['player2_name']
+        player1_color = game['player1_color']
+        result = game['result']
+        note = game['note']
+
+        # Determine sente (先手 - black) and gote (後手 - white) players
+        if player1_color.lower() == 'sente':
+            sente_player = player1_name
+            gote_player = player2_name
+        else:
+            sente_player = player2_name
+            gote_player = player1_name
+
+        # Use emojis for player sides (black goes first in shogi)
+        sente_emoji = '🟥'  # Red square for sente
+        gote_emoji = '⬜'  # White square for gote
+
+        # Format the result
+        if result == '1-0':
+            result_text = f"{sente_player} (sente)"
+        elif result == '0-1':
+            result_text = f"{gote_player} (gote)"
+        else:
+            result_text = "Draw"
+
+        # Add the game to the embed
+        embed.add_field(
+            name=f"**{timestamp}**                                                                 ID: {game_id}",
+            value=(
+                f"{sente_emoji} **{sente_player}** vs {gote_emoji} **{gote_player}**\n"
+                f"**Result:** {result_text}\n"
+                f"{f'**Note:** {note[:200]}...' if note and len(note) > 200 else f'**Note:** {note}' if note else ''}"
+                f"\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+            ),
+            inline=False
+        )
+
+    embed.set_footer(text=f"Page {page_number + 1}{'' if has_next else ' (last)'}")
+    return embed
+
+
+# Number of games per page
+GAMES_PER_PAGE = 5
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def page_cursors(player_id, page_number, games, has_next):
+    """
+    Returns the (previous, next) button cursors for a page: the player (0 for everyone)
+    and the (date_played, game_id) keyset of the first game prefixed with `b` (before)
+    or of the last game prefixed with `a` (after).
+    """
+    def keyset(game):
+        return f"{(game['date_played'] - EPOCH) // timedelta(microseconds=1)}_{game['game_id']}"
+
+    previous_cursor = f"{player_id or 0}:b{keyset(games[0])}" if page_number > 0 else None
+    next_cursor = f"{player_id or 0}:a{keyset(games[-1])}" if has_next else None
+    return previous_cursor, next_cursor
+
+
+@paginator('history')
+async def render_history_page(interaction, page_number, cursor):
+    """
+    Renders the history page a button points at, from the player and keyset stored in its custom_id.
+    """
+    guild_id = interaction.guild.id
+    player_id, keyset = cursor.split(':')
+    player_id = int(player_id) or None
+    micros, game_id = keyset[1:].split('_')
+    keyset_game = {'date_played': EPOCH + timedelta(microseconds=int(micros)), 'game_id': int(game_id)}
+
+    if keyset.startswith('a'):
+        games = await fetch_history_page(guild_id, GAMES_PER_PAGE + 1, player_id=player_id, after=keyset_game)
+        has_next = len(games) > GAMES_PER_PAGE
+        games = games[:GAMES_PER_PAGE]
+    else:
+        games = await fetch_history_page(guild_id, GAMES_PER_PAGE, player_id=player_id, before=keyset_game)
+        has_next = True
+    if not games:
+        return None
+
+    if player_id is None:
+        title = "Game History - All Players"
+    else:
+        player = (await get_rank_index(guild_id)).get(player_id)
+        title = f"Game History - {player['player_name'] if player else 'Unknown'}"
+
+    embed = build_history_page(title, games, page_number, has_next)
+    return (embed, *page_cursors(player_id, page_number, games, has_next))
 
 
 class History(commands.Cog):
@@ -29,130 +194,29 @@ class History(commands.Cog):
             return
 
         if input_text.upper() == "ALL":
-            # Fetch the most recent games for all players in the current guild
-            games = fetch_query(
-                """
-                SELECT g.game_id, g.date_played, p1.player_name AS player1_name, p2.player_name AS player2_name,
-                       g.player1_color, g.result, g.note
-                FROM games g
-                JOIN players p1 ON g.player1_id = p1.player_id
-                JOIN players p2 ON g.player2_id = p2.player_id
-                WHERE g.guild_id = %s
-                ORDER BY g.date_played DESC
-                LIMIT 25
-                """,
-                (guild_id,)
-            )
+            player_id = None
             title = "Game History - All Players"
         else:
             # Fetch player ID for the given name in the current guild
-            player_data = fetch_query(
-                "SELECT player_id FROM players WHERE player_name = %s AND guild_id = %s",
-                (input_text, guild_id)
-            )
+            player_data = await get_player(guild_id, player_name=input_text)
             if not player_data:
                 await ctx.send(f"No player found with the name `{input_text}` in this guild.")
                 return
-            player_id = player_data[0]['player_id']
-
-            # Fetch the most recent games for the player in the current guild
-            games = fetch_query(
-                """
-                SELECT g.game_id, g.date_played, p1.player_name AS player1_name, p2.player_name AS player2_name,
-                       g.player1_color, g.result, g.note
-                FROM games g
-                JOIN players p1 ON g.player1_id = p1.player_id
-                JOIN players p2 ON g.player2_id = p2.player_id
-                WHERE (g.player1_id = %s OR g.player2_id = %s) AND g.guild_id = %s
-                ORDER BY g.date_played DESC
-                LIMIT 25
-                """,
-                (player_id, player_id, guild_id)
-            )
+            player_id = player_data['player_id']
             title = f"Game History - {input_text}"
 
+        # Only the visible page is fetched and rendered; one extra row tells us if there is a next page
+        games = await fetch_history_page(guild_id, GAMES_PER_PAGE + 1, player_id=player_id)
+
         if not games:
             await ctx.send("No games found.")
             return
 
-        # Paginate the games (5 games per page)
-        games_per_page = 5
-        pages = []
-        for i in range(0, len(games), games_per_page):
-            chunk = games[i:i+games_per_page]
-            embed = discord.Embed(title=title, color=discord.Color.blue())
-            for game in chunk:
-                game_id = game['game_id']
-                timestamp = game['date_played'].strftime('%Y-%m-%d') if game['date_played'] else 'Unknown'
-                player1_name = game['player1_name']
-                player2_name = game['player2_name']
-                player1_color = game['player1_color']
-                result = game['result']
-                note = game['note']
-
-                # Determine sente (先手 - black) and gote (後手 - white) players
-                if player1_color.lower() == 'sente':
-                    sente_player = player1_name
-                    gote_player = player2_name
-                else:
-                    sente_player = player2_name
-                    gote_player = player1_name
-
-                # Use emojis for player sides (black goes first in shogi)
-                sente_emoji = '🟥'  # Red square for sente
-                gote_emoji = '⬜'  # White square for gote
-
-                # Format the result
-                if result == '1-0':
-                    result_text = f"{sente_player} (sente)"
-                elif result == '0-1':
-                    result_text = f"{gote_player} (gote)"
-                else:
-                    result_text = "Draw"
-
-                # Add the game to the embed
-                embed.add_field(
-                    name=f"**{timestamp}**                                                                 ID: {game_id}",
-                    value=(
-                        f"{sente_emoji} **{sente_player}** vs {gote_emoji} **{gote_player}**\n"
-                        f"**Result:** {result_text}\n"
-                        f"{f'**Note:** {note[:200]}...' if note and len(note) > 200 else f'**Note:** {note}' if note else ''}"
-                        f"\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-                    ),
-                    inline=False
-                )
-
-            embed.set_footer(text=f"Page {len(pages)+1}/{((len(games) - 1) // games_per_page) + 1}")
-            pages.append(embed)
-
-        # Send the first page
-        current_page = 0
-        message = await ctx.send(embed=pages[current_page])
-
-        # Add reactions for pagination if there are multiple pages
-        if len(pages) > 1:
-            await message.add_reaction('⬅️')
-            await message.add_reaction('➡️')
-
-            def reaction_check(reaction, user):
-                return (
-                    user == ctx.author and
-                    reaction.message.id == message.id and
-                    str(reaction.emoji) in ['⬅️', '➡️']
-                )
-
-            while True:
-                try:
-                    reaction, user = await self.bot.wait_for('reaction_add', timeout=60, check=reaction_check)
-                    if str(reaction.emoji) == '➡️' and current_page < len(pages) - 1:
-                        current_page += 1
-                        await message.edit(embed=pages[current_page])
-                    elif str(reaction.emoji) == '⬅️' and current_page > 0:
-                        current_page -= 1
-                        await message.edit(embed=pages[current_page])
-                    await message.remove_reaction(reaction, user)
-                except asyncio.TimeoutError:
-                    break
+        has_next = len(games) > GAMES_PER_PAGE
+        games = games[:GAMES_PER_PAGE]
+
+        embed = build_history_page(title, games, 0, has_next)
+        await send_paginator(ctx, 'history', embed, *page_cursors(player_id, 0, games, has_next))
 
     # The required setup function
 async def setup(bot):
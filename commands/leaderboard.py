@@ -1,9 +1,117 @@
 import discord
 from discord.ext import commands
-from utils.db import fetch_query
-import asyncio
+from utils.db import async_fetch_query
+from utils.rank_index import get_rank_index
 import re
-from utils.decorators import command_in_progress, active_commands
+from utils.decorators import command_in_progress
+from utils.paginator import paginator, send_paginator
+
+
+async def fetch_leaderboard_page(guild_id, limit, after=None, before=None):
+    """
+    Fetches one leaderboard page using keyset pagination on (elo, player_id).
+    Pass the last row of the current page as `after` for the next page, or its
+    first row as `before` for the previous one. Each page is a single index range
+    scan on `idx_players_guild_elo`, however deep it is.
+    """
+    if after:
+        return await async_fetch_query(
+            """
+            SELECT player_id, player_name, elo FROM players
+            WHERE guild_id = %s AND (elo, player_id) < (%s, %s)
+            ORDER BY elo DESC, player_id DESC
+            LIMIT %s
+            """,
+            (guild_id, after['elo'], after['player_id'], limit)
+        )
+    if before:
+        rows = await async_fetch_query(
+            """
+            SELECT player_id, player_name, elo FROM players
+            WHERE guild_id = %s AND (elo, player_id) > (%s, %s)
+            ORDER BY elo ASC, player_id ASC
+            LIMIT %s
+            """,
+            (guild_id, before['elo'], before['player_id'], limit)
+        )
+        return rows[::-1]
+    return await async_fetch_query(
+        """
+        SELECT player_id, player_name, elo FROM players
+        WHERE guild_id = %s
+        ORDER BY elo DESC, player_id DESC
+        LIMIT %s
+        """,
+        (guild_id, limit)
+    )
+
+
+# Number of players per page
+PER_PAGE = 5
+
+# Medal emojis for the top 3 players
+MEDALS = ["🥇", "🥈", "🥉"]
+
+
+def build_leaderboard_page(guild, rank_index, page_number, page_players):
+    """
+    Renders one page of the leaderboard as an embed.
+    """
+    total_pages = max((len(rank_index) - 1) // PER_PAGE + 1, page_number + 1)
+
+    embed = discord.Embed(
+        title=f"🏆 **Leaderboard** - {guild.name}",
+        description=f"Page {page_number + 1}/{total_pages}",
+        color=discord.Color.gold()
+    )
+
+    # Build the leaderboard table
+    table_lines = []
+    for idx, player in enumerate(page_players):
+        rank = rank_index.rank(player['player_id']) or page_number * PER_PAGE + idx + 1
+        medal = MEDALS[rank - 1] if rank <= 3 else f"#{rank}"
+        name = player['player_name']
+        elo = player['elo']
+
+        # Format the line with rank, name, and ELO
+        table_lines.append(f"{medal:<3} {name:<20} {elo:>5}")
+
+    # Add the table to the embed
+    table = "```" + "\n".join(table_lines) + "```"
+    embed.add_field(name="Rankings", value=table, inline=False)
+    embed.set_footer(text="Use ⬅️ and ➡️ to navigate pages.")
+    return embed
+
+
+def page_cursors(rank_index, page_number, page_players):
+    """
+    Returns the (previous, next) button cursors for a page: the keyset of its first row
+    prefixed with `b` (before) and of its last row prefixed with `a` (after).
+    """
+    first, last = page_players[0], page_players[-1]
+    previous_cursor = f"b{first['elo']}_{first['player_id']}" if page_number > 0 else None
+    has_next = (page_number + 1) * PER_PAGE < len(rank_index)
+    next_cursor = f"a{last['elo']}_{last['player_id']}" if has_next else None
+    return previous_cursor, next_cursor
+
+
+@paginator('leaderboard')
+async def render_leaderboard_page(interaction, page_number, cursor):
+    """
+    Renders the leaderboard page a button points at, from the keyset stored in its custom_id.
+    """
+    elo, player_id = cursor[1:].split('_')
+    keyset = {'elo': int(elo), 'player_id': int(player_id)}
+    if cursor.startswith('a'):
+        page_players = await fetch_leaderboard_page(interaction.guild.id, PER_PAGE, after=keyset)
+    else:
+        page_players = await fetch_leaderboard_page(interaction.guild.id, PER_PAGE, before=keyset)
+    if not page_players:
+        return None
+
+    rank_index = await get_rank_index(interaction.guild.id)
+    embed = build_leaderboard_page(interaction.guild, rank_index, page_number, page_players)
+    return (embed, *page_cursors(rank_index, page_number, page_players))
 
 
 class Leaderboard(commands.Cog):
@@ -17,88 +125,22 @@ class Leaderboard(commands.Cog):
         """
         guild_id = ctx.guild.id
 
-        # Fetch players from the current guild, ordered by ELO descending
-        players = fetch_query(
-            "SELECT player_name, elo FROM players WHERE guild_id = %s ORDER BY elo DESC",
-            (guild_id,)
-        )
+        # The rank index doubles as a cheap, always-current player count for the guild
+        rank_index = await get_rank_index(guild_id)
 
         # Check if the leaderboard is empty
-        if not players:
+        if not len(rank_index):
+            await ctx.send("The leaderboard is currently empty.")
+            return
+
+        # Only the visible page is fetched; its first and last rows are the keyset cursors
+        page_players = await fetch_leaderboard_page(guild_id, PER_PAGE)
+        if not page_players:
             await ctx.send("The leaderboard is currently empty.")
             return
 
-        # Pagination setup
-        per_page = 5  # Number of players per page
-        total_pages = (len(players) - 1) // per_page + 1  # Calculate total pages
-
-        # Medal emojis for the top 3 players
-        medals = ["🥇", "🥈", "🥉"]
-
-        # Function to generate the embed for a specific page
-        def get_page(page_number):
-            start_index = page_number * per_page
-            end_index = start_index + per_page
-            page_players = players[start_index:end_index]
-
-            embed = discord.Embed(
-                title=f"🏆 **Leaderboard** - {ctx.guild.name}",
-                description=f"Page {page_number + 1}/{total_pages}",
-                color=discord.Color.gold()
-            )
-
-            # Build the leaderboard table
-            table_lines = []
-            for idx, player in enumerate(page_players):
-                rank = start_index + idx + 1
-                medal = medals[rank - 1] if rank <= 3 else f"#{rank}"
-                name = player['player_name']
-                elo = player['elo']
-
-                # Format the line with rank, name, and ELO
-                table_lines.append(f"{medal:<3} {name:<20} {elo:>5}")
-
-            # Add the table to the embed
-            table = "```" + "\n".join(table_lines) + "```"
-            embed.add_field(name="Rankings", value=table, inline=False)
-            embed.set_footer(text="Use ⬅️ and ➡️ to navigate pages. Timeout after 60s of inactivity.")
-            return embed
-
-        # Send the initial leaderboard page
-        current_page = 0
-        message = await ctx.send(embed=get_page(current_page))
-
-        # Add reactions for pagination if there are multiple pages
-        if total_pages > 1:
-            await message.add_reaction('⬅️')
-            await message.add_reaction('➡️')
-
-            def reaction_check(reaction, user):
-                return (
-                    user == ctx.author and
-                    reaction.message.id == message.id and
-                    str(reaction.emoji) in ['⬅️', '➡️']
-                )
-
-            while True:
-                try:
-                    reaction, user = await self.bot.wait_for('reaction_add', timeout=60.0, check=reaction_check)
-
-                    if str(reaction.emoji) == '➡️' and current_page < total_pages - 1:
-                        current_page += 1
-                        await message.edit(embed=get_page(current_page))
-                        await message.remove_reaction(reaction, user)
-                    elif str(reaction.emoji) == '⬅️' and current_page > 0:
-                        current_page -= 1
-                        await message.edit(embed=get_page(current_page))
-                        await message.remove_reaction(reaction, user)
-                except asyncio.TimeoutError:
-                    # Clear reactions after timeout
-                    try:
-                        await message.clear_reactions()
-                    except discord.Forbidden:
-                        pass
-                    break
+        embed = build_leaderboard_page(ctx.guild, rank_index, 0, page_players)
+        await send_paginator(ctx, 'leaderboard', embed, *page_cursors(rank_index, 0, page_players))
 
     # Setup function to load the cog
 async def setup(bot):
@@ -1,8 +1,154 @@
 import discord
 from discord.ext import commands
-import asyncio
-from utils.db import fetch_query, execute_query
-from utils.decorators import command_in_progress, active_commands
+from utils.db import async_fetch_query, async_execute_query
+from utils.rank_index import index_player, unindex_player
+from utils.player_cache import get_player, invalidate_players
+from utils.replay import revert_game
+from utils.role_update import update_player_roles
+from utils.role_queue import snapshot_ranked_roles, queue_rank_changes
+from utils.decorators import command_in_progress
+from utils.paginator import paginator, send_paginator
+
+
+MANUAL_COMMANDS = [
+    {
+        "command": "!signup",
+        "description": "Register yourself in the bot system.",
+        "parameters": "None",
+        "example": "!signup",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!profile [player_name]",
+        "description": "View your profile or another player's profile.",
+        "parameters": "`[player_name]` (optional) - The name of the player whose profile you want to view.",
+        "example": "!profile AliceC",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!addgame <opponent_name>",
+        "description": "Record a new game against an opponent.",
+        "parameters": "`<opponent_name>` - The name of your opponent.",
+        "example": "!addgame BobT",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!history",
+        "description": "View game history for all players or a specific player.",
+        "parameters": "None",
+        "example": "!history",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!export [ALL|player_name] [csv|ndjson] [gzip]",
+        "description": "Download the full game history of the server or of one player as a file.",
+        "parameters": "`[ALL|player_name]` (optional) - Whose games to export.\n`[csv|ndjson]` (optional) - File format, CSV by default.\n`[gzip]` (optional) - Compress the file.",
+        "example": "!export AliceC ndjson gzip",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!leaderboard",
+        "description": "Display the current leaderboard.",
+        "parameters": "None",
+        "example": "!leaderboard or !lb",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!manual",
+        "description": "Display this manual.",
+        "parameters": "None",
+        "example": "!manual",
+        "roles": ["Everyone"]
+    },
+    {
+        "command": "!elowand <player_name> <new_elo>",
+        "description": "Set a player's ELO rating (Admin only).",
+        "parameters": "`<player_name>` - The name of the player.\n`<new_elo>` - The new ELO rating.",
+        "example": "!elowand AliceC 1500",
+        "roles": ["Shogibot Admin"]
+    },
+    {
+        "command": "!removegame <gameID>",
+        "description": "Remove a game by its ID (Admin only).",
+        "parameters": "`<gameID>` - The ID of the game to remove.",
+        "example": "!removegame 42",
+        "roles": ["Shogibot Admin"]
+    },
+    {
+        "command": "!clear <number>",
+        "description": "Clear the specified number of messages from the channel (Admin only).",
+        "parameters": "`<number>` - The number of messages to delete.",
+        "example": "!clear 1000",
+        "roles": ["Shogibot Admin"]
+    },
+    {
+        "command": "!reloadroles",
+        "description": "Reload the server's role configuration after editing the roles table (Admin only).",
+        "parameters": "None",
+        "example": "!reloadroles",
+        "roles": ["Shogibot Admin"]
+    },
+    {
+        "command": "!removemember <player_name>",
+        "description": "Remove a player from the database (Admin only).",
+        "parameters": "`<player_name>` - The name of the player to remove.",
+        "example": "!removemember JohnC",
+        "roles": ["Shogibot Admin"]
+    },
+]
+
+
+def build_manual_pages(member):
+    """
+    Renders the manual pages listing the commands this member may use.
+    """
+    user_roles = [role.name for role in member.roles]
+    accessible_commands = [
+        cmd for cmd in MANUAL_COMMANDS
+        if "Everyone" in cmd["roles"] or any(role in user_roles for role in cmd["roles"])
+    ]
+
+    pages = []
+    commands_per_page = 4
+    for i in range(0, len(accessible_commands), commands_per_page):
+        chunk = accessible_commands[i:i+commands_per_page]
+        embed = discord.Embed(title="📖 Bot Manual", description="List of available commands.", color=discord.Color.green())
+        for cmd_info in chunk:
+            embed.add_field(
+                name=f"{cmd_info['command']}",
+                value=(
+                    f"**Description:** {cmd_info['description']}\n"
+                    f"**Parameters:** {cmd_info.get('parameters', 'None')}\n"
+                    f"**Example:** `{cmd_info.get('example', 'None')}`"
+                ),
+                inline=False
+            )
+        page_number = (i // commands_per_page) + 1
+        total_pages = ((len(accessible_commands) - 1) // commands_per_page) + 1
+        embed.set_footer(text=f"Page {page_number}/{total_pages}")
+        pages.append(embed)
+    return pages
+
+
+def page_cursors(pages, page_number):
+    """
+    Returns (embed, previous cursor, next cursor) for a manual page. Manual pages are
+    rebuilt on every click, so the page number is all the state a button needs.
+    """
+    previous_cursor = "-" if page_number > 0 else None
+    next_cursor = "-" if page_number < len(pages) - 1 else None
+    return pages[page_number], previous_cursor, next_cursor
+
+
+@paginator('manual')
+async def render_manual_page(interaction, page_number, cursor):
+    """
+    Renders the manual page a button points at for the member who clicked it.
+    """
+    pages = build_manual_pages(interaction.user)
+    if not 0 <= page_number < len(pages):
+        return None
+    return page_cursors(pages, page_number)
 
 
 class Manual(commands.Cog):
@@ -12,158 +158,46 @@ class Manual(commands.Cog):
     @commands.command()
     async def manual(self, ctx):
         """Displays the manual with all available commands."""
-        commands_info = [
-            {
-                "command": "!signup",
-                "description": "Register yourself in the bot system.",
-                "parameters": "None",
-                "example": "!signup",
-                "roles": ["Everyone"]
-            },
-            {
-                "command": "!profile [player_name]",
-                "description": "View your profile or another player's profile.",
-                "parameters": "`[player_name]` (optional) - The name of the player whose profile you want to view.",
-                "example": "!profile AliceC",
-                "roles": ["Everyone"]
-            },
-            {
-                "command": "!addgame <opponent_name>",
-                "description": "Record a new game against an opponent.",
-                "parameters": "`<opponent_name>` - The name of your opponent.",
-                "example": "!addgame BobT",
-                "roles": ["Everyone"]
-            },
-            {
-                "command": "!history",
-                "description": "View game history for all players or a specific player.",
-                "parameters": "None",
-                "example": "!history",
-                "roles": ["Everyone"]
-            },
-            {
-                "command": "!leaderboard",
-                "description": "Display the current leaderboard.",
-                "parameters": "None",
-                "example": "!leaderboard or !lb",
-                "roles": ["Everyone"]
-            },
-            {
-                "command": "!manual",
-                "description": "Display this manual.",
-                "parameters": "None",
-                "example": "!manual",
-                "roles": ["Everyone"]
-            },
-            {
-                "command": "!elowand <player_name> <new_elo>",
-                "description": "Set a player's ELO rating (Admin only).",
-                "parameters": "`<player_name>` - The name of the player.\n`<new_elo>` - The new ELO rating.",
-                "example": "!elowand AliceC 1500",
-                "roles": ["Shogibot Admin"]
-            },
-            {
-                "command": "!removegame <gameID>",
-                "description": "Remove a game by its ID (Admin only).",
-                "parameters": "`<gameID>` - The ID of the game to remove.",
-                "example": "!removegame 42",
-                "roles": ["Shogibot Admin"]
-            },
-            {
-                "command": "!clear <number>",
-                "description": "Clear the specified number of messages from the channel (Admin only).",
-                "parameters": "`<number>` - The number of messages to delete.",
-                "example": "!clear 1000",
-                "roles": ["Shogibot Admin"]
-            },
-            {
-                "command": "!removemember <player_name>",
-                "description": "Remove a player from the database (Admin only).",
-                "parameters": "`<player_name>` - The name of the player to remove.",
-                "example": "!removemember JohnC",
-                "roles": ["Shogibot Admin"]
-            },
-        ]
-
-        user_roles = [role.name for role in ctx.author.roles]
-        accessible_commands = [
-            cmd for cmd in commands_info
-            if "Everyone" in cmd["roles"] or any(role in user_roles for role in cmd["roles"])
-        ]
-
-        pages = []
-        commands_per_page = 4
-        for i in range(0, len(accessible_commands), commands_per_page):
-            chunk = accessible_commands[i:i+commands_per_page]
-            embed = discord.Embed(title="📖 Bot Manual", description="List of available commands.", color=discord.Color.green())
-            for cmd_info in chunk:
-                embed.add_field(
-                    name=f"{cmd_info['command']}",
-                    value=(
-                        f"**Description:** {cmd_info['description']}\n"
-                        f"**Parameters:** {cmd_info.get('parameters', 'None')}\n"
-                        f"**Example:** `{cmd_info.get('example', 'None')}`"
-                    ),
-                    inline=False
-                )
-            page_number = (i // commands_per_page) + 1
-            total_pages = ((len(accessible_commands) - 1) // commands_per_page) + 1
-            embed.set_footer(text=f"Page {page_number}/{total_pages}")
-            pages.append(embed)
-
-        current_page = 0
-        message = await ctx.send(embed=pages[current_page])
-
-        if len(pages) > 1:
-            await message.add_reaction('⬅️')
-            await message.add_reaction('➡️')
-
-            def check(reaction, user):
-                return user == ctx.author and str(reaction.emoji) in ['⬅️', '➡️'] and reaction.message.id == message.id
-
-            while True:
-                try:
-                    reaction, user = await self.bot.wait_for('reaction_add', timeout=120, check=check)
-                    if str(reaction.emoji) == '➡️' and current_page < len(pages) - 1:
-                        current_page += 1
-                        await message.edit(embed=pages[current_page])
-                    elif str(reaction.emoji) == '⬅️' and current_page > 0:
-                        current_page -= 1
-                        await message.edit(embed=pages[current_page])
-                    await message.remove_reaction(reaction, user)
-                except asyncio.TimeoutError:
-                    await message.clear_reactions()
-                    break
+        pages = build_manual_pages(ctx.author)
+        await send_paginator(ctx, 'manual', *page_cursors(pages, 0))
 
     @commands.command()
     @commands.has_role("Shogibot Admin")
     async def elowand(self, ctx, player_name: str, new_elo: int):
         """Set a player's ELO rating."""
-        player_data = fetch_query(
-            "SELECT player_id FROM players WHERE player_name = %s AND guild_id = %s",
-            (player_name, ctx.guild.id)
-        )
+        player_data = await get_player(ctx.guild.id, player_name=player_name)
         if not player_data:
             await ctx.send(f"❌ Player `{player_name}` not found in the database.")
             return
 
-        execute_query(
-            "UPDATE players SET elo = %s WHERE player_id = %s",
-            (new_elo, player_data[0]['player_id'])
+        ranked_roles_before = await snapshot_ranked_roles(ctx.guild.id)
+        await async_execute_query(
+            "UPDATE players SET elo = %s, base_elo = base_elo + (%s - elo) WHERE player_id = %s",
+            (new_elo, new_elo, player_data['player_id'])
         )
+        index_player(ctx.guild.id, player_data['player_id'], new_elo)
+        invalidate_players(ctx.guild.id, [player_data['player_id']])
+        await queue_rank_changes(ctx.guild, ranked_roles_before, [player_data['player_id']])
         await ctx.send(f"✅ Updated `{player_name}`'s ELO to {new_elo}.")
 
     @commands.command()
     @commands.has_role("Shogibot Admin")
     async def removegame(self, ctx, game_id: int):
         """Remove a game from the database by its ID."""
-        game_data = fetch_query("SELECT * FROM games WHERE game_id = %s", (game_id,))
+        game_data = await async_fetch_query("SELECT * FROM games WHERE game_id = %s", (game_id,))
         if not game_data:
             await ctx.send(f"❌ No game found with ID `{game_id}`.")
             return
 
-        execute_query("DELETE FROM games WHERE game_id = %s", (game_id,))
-        await ctx.send(f"✅ Removed game with ID `{game_id}` from the database.")
+        guild = self.bot.get_guild(game_data[0]['guild_id']) or ctx.guild
+        ranked_roles_before = await snapshot_ranked_roles(guild.id)
+        try:
+            _, changed_player_ids = await revert_game(guild.id, game_id)
+        except ValueError as e:
+            await ctx.send(f"❌ Game `{game_id}` could not be removed: {e}")
+            return
+        await queue_rank_changes(guild, ranked_roles_before, changed_player_ids)
+        await ctx.send(f"✅ Removed game with ID `{game_id}` from the database and recalculated ratings.")
 
     @commands.command()
     @commands.has_role("Shogibot Admin")
@@ -179,15 +213,19 @@ class Manual(commands.Cog):
     @commands.has_role("Shogibot Admin")
     async def removemember(self, ctx, player_name: str):
         """Remove a player from the database."""
-        player_data = fetch_query(
-            "SELECT player_id FROM players WHERE player_name = %s AND guild_id = %s",
-            (player_name, ctx.guild.id)
-        )
+        player_data = await get_player(ctx.guild.id, player_name=player_name)
         if not player_data:
             await ctx.send(f"❌ Player `{player_name}` not found in the database.")
             return
 
-        execute_query("DELETE FROM players WHERE player_id = %s", (player_data[0]['player_id'],))
+        ranked_roles_before = await snapshot_ranked_roles(ctx.guild.id)
+        await async_execute_query("DELETE FROM players WHERE player_id = %s", (player_data['player_id'],))
+        unindex_player(ctx.guild.id, player_data['player_id'])
+        invalidate_players(ctx.guild.id, [player_data['player_id']])
+        member = ctx.guild.get_member(player_data['discord_user_id'])
+        if member:
+            await update_player_roles(member, None, None, player_data['player_id'])
+        await queue_rank_changes(ctx.guild, ranked_roles_before)
         await ctx.send(f"✅ Player `{player_name}` has been removed from the database.")
 
     # The required setup function
@@ -1,8 +1,8 @@
 import discord
 from discord.ext import commands
-from utils.db import fetch_query
+from utils.player_cache import get_player
 import logging
-from utils.decorators import command_in_progress, active_commands
+from utils.decorators import command_in_progress
 
 
 class Profile(commands.Cog):
@@ -20,44 +20,34 @@ class Profile(commands.Cog):
         if player_name is None:
             # Show the invoker's profile
             discord_user_id = ctx.author.id
-            player_data = fetch_query(
-                """
-                SELECT player_name, elo, wins, losses, draws, games_played
-                FROM players WHERE discord_user_id = %s AND guild_id = %s
-                """,
-                (discord_user_id, guild_id)
-            )
+            player_data = await get_player(guild_id, discord_user_id=discord_user_id)
             if not player_data:
                 await ctx.send("You are not registered yet. Use `!signup` to register.")
                 return
             member = ctx.author
         else:
             # Show the profile of the specified player
-            player_data = fetch_query(
-                """
-                SELECT discord_user_id, player_name, elo, wins, losses, draws, games_played
-                FROM players WHERE player_name = %s AND guild_id = %s
-                """,
-                (player_name, guild_id)
-            )
+            player_data = await get_player(guild_id, player_name=player_name)
             if not player_data:
                 await ctx.send(f"No player found with the name `{player_name}` in this guild.")
                 return
-            member = ctx.guild.get_member(player_data[0]['discord_user_id'])
+            member = ctx.guild.get_member(player_data['discord_user_id'])
 
-        if not player_data or not isinstance(player_data[0], dict):
+        if not isinstance(player_data, dict):
             logging.error(f"Unexpected query result: {player_data}")
             await ctx.send("Error fetching your profile. Please contact an admin.")
             return
 
         # Parse data safely
         try:
-            player_name = player_data[0].get('player_name')
-            elo = int(player_data[0].get('elo', 1200))  # Default to 1200 if invalid
-            wins = int(player_data[0].get('wins', 0))
-            losses = int(player_data[0].get('losses', 0))
-            draws = int(player_data[0].get('draws', 0))
-            games_played = int(player_data[0].get('games_played', 0))
+            player_name = player_data.get('player_name')
+            elo = int(player_data.get('elo', 1200))  # Default to 1200 if invalid
+            wins = int(player_data.get('wins', 0))
+            losses = int(player_data.get('losses', 0))
+            draws = int(player_data.get('draws', 0))
+            games_played = int(player_data.get('games_played', 0))
+            glicko_rating = float(player_data.get('glicko_rating', 1500))
+            glicko_rd = float(player_data.get('glicko_rd', 350))
         except ValueError as e:
             logging.error(f"Data type error: {e}")
             await ctx.send("Error parsing your profile data. Please contact an admin.")
@@ -81,7 +71,7 @@ class Profile(commands.Cog):
         )
         embed.add_field(name="ELO", value=f"{elo}", inline=True)
         embed.add_field(name="Games Played", value=f"{games_played}", inline=True)
-        embed.add_field(name="\u200b", value="\u200b", inline=True)  # Empty field for spacing
+        embed.add_field(name="Glicko-2", value=f"{glicko_rating:.0f} ± {2 * glicko_rd:.0f}", inline=True)
 
         embed.add_field(name="Wins", value=f"{wins}", inline=True)
         embed.add_field(name="Losses", value=f"{losses}", inline=True)
@@ -1,16 +1,31 @@
 import discord
 from discord.ext import commands
-from utils.db import execute_query, fetch_query
+from utils.db import async_fetch_query
+from utils.rank_index import index_player
+from utils.player_cache import get_player, invalidate_players
+from utils.role_queue import snapshot_ranked_roles, queue_rank_changes
 from config import ADMIN_ROLE_NAME
-import asyncio
 import re
 import logging
-from utils.decorators import command_in_progress, active_commands
+from utils.decorators import command_in_progress
+from utils.wizard import register_wizard, create_session, advance_session, end_session, wizard_buttons, wizard_modal
+
+
+# Total time allowed for the signup process, in seconds
+SIGNUP_TIMEOUT = 180
+
+# Level button value -> (starting ELO, level)
+SIGNUP_LEVELS = {
+    '1': (500, 'Beginner'),
+    '2': (1000, 'Intermediate'),
+    '3': (1000, 'Advanced'),
+}
 
 
 class Signup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        register_wizard('signup', self.handle_step, self.handle_expiry)
 
     @commands.command()
     @command_in_progress()
@@ -26,16 +41,13 @@ class Signup(commands.Cog):
         logging.info(f"Signup initiated by user: {user_name} (ID: {user_id}) in guild: {guild_name} (ID: {guild_id})")
 
         # Check if the user is already signed up
-        existing_user = fetch_query(
-            "SELECT player_name FROM players WHERE discord_user_id = %s AND guild_id = %s",
-            (user_id, guild_id)
-        )
+        existing_user = await get_player(guild_id, discord_user_id=user_id)
         if existing_user:
-            logging.info(f"User {user_name} (ID: {user_id}) is already signed up with player name: {existing_user[0]['player_name']}")
+            logging.info(f"User {user_name} (ID: {user_id}) is already signed up with player name: {existing_user['player_name']}")
             already_signed_up_embed = discord.Embed(
                 title="🔒 **Already Signed Up**",
                 description=(
-                    f"You are already signed up as **{existing_user[0]['player_name']}**.\n\n"
+                    f"You are already signed up as **{existing_user['player_name']}**.\n\n"
                     "If you need to update your information, please contact an admin."
                 ),
                 color=discord.Color.orange()
@@ -43,157 +55,164 @@ class Signup(commands.Cog):
             await ctx.send(embed=already_signed_up_embed)
             return
 
-        # Initialize variables
-        total_timeout = 180  # Total time allowed for the signup process
-        start_time = asyncio.get_event_loop().time()
+        # The wizard's state is persisted, so the command returns now and each click resumes it
+        session_id = await create_session('signup', guild_id, user_id, 'name', {}, SIGNUP_TIMEOUT, ctx.channel.id)
+        if session_id is None:
+            await ctx.send("❌ You already have a game or signup in progress. Please finish it before starting another.")
+            return
+
+        # Step 1: Ask for the player's name
+        await ctx.send(embed=self.name_embed(), view=wizard_buttons(session_id, [
+            ("Enter name", '📝', 'name', '', discord.ButtonStyle.primary),
+        ]))
+
+    async def handle_step(self, interaction, session, action, value):
+        """
+        Resumes a signup wizard from a button click or modal submission.
+        The whole signup shares one expiry, SIGNUP_TIMEOUT seconds after it started.
+        """
+        if interaction.user.id != session['user_id']:
+            await interaction.response.send_message("❌ These buttons are not for you.", ephemeral=True)
+            return
+
+        session_id = session['session_id']
+        state = session['state']
+        guild_id = session['guild_id']
+        user_id, user_name = interaction.user.id, interaction.user.name
 
-        def message_check(msg):
-            return msg.author == ctx.author and msg.channel == ctx.channel
+        if session['step'] == 'name' and action == 'name':
+            await interaction.response.send_modal(wizard_modal(session_id, 'name_text', "Signup", [
+                ('player_name', "Your name (FirstName)(LastInitial)", 32, "e.g. DwayneJ"),
+            ]))
 
-        def calculate_time_remaining():
-            return total_timeout - (asyncio.get_event_loop().time() - start_time)
+        elif session['step'] == 'name' and action == 'name_text':
+            player_name = value.get('player_name', '').strip()
 
-        # Step 1: Ask for the player's name
-        while True:
-            time_remaining = calculate_time_remaining()
-            if time_remaining <= 0:
-                await self.send_timeout_embed(ctx)
+            if not re.match(r'^[A-Z][a-z]+[A-Z]$', player_name):
+                logging.warning(f"User {user_name} (ID: {user_id}) entered an invalid name: {player_name}")
+                await interaction.response.send_message(embed=self.invalid_name_embed(), ephemeral=True)
                 return
 
-            name_embed = discord.Embed(
-                title="📝 **Signup Process**",
-                description=(
-                    "Please input your name in the format:\n"
-                    "**(FirstName)(LastInitial)**\n\n"
-                    "**Examples:**\n"
-                    "• DwayneJ\n"
-                    "• ClarkK\n"
-                    "• MarieC"
-                ),
-                color=discord.Color.blue()
-            )
-            name_embed.set_footer(text=f"You have {int(time_remaining)} seconds to reply.")
-            await ctx.send(embed=name_embed)
-
-            try:
-                name_msg = await self.bot.wait_for("message", check=message_check, timeout=time_remaining)
-                player_name = name_msg.content.strip()
-
-                if not re.match(r'^[A-Z][a-z]+[A-Z]$', player_name):
-                    logging.warning(f"User {user_name} (ID: {user_id}) entered an invalid name: {player_name}")
-                    await ctx.send(embed=self.invalid_name_embed())
-                    continue
-
-                # Check for duplicate names
-                duplicate_name = fetch_query(
-                    "SELECT player_name FROM players WHERE player_name = %s AND guild_id = %s",
-                    (player_name, guild_id)
+            # Check for duplicate names
+            duplicate_name = await get_player(guild_id, player_name=player_name)
+            if duplicate_name:
+                logging.info(f"User {user_name} (ID: {user_id}) tried to use a duplicate name: {player_name}")
+                duplicate_embed = discord.Embed(
+                    title="❌ **Duplicate Name**",
+                    description=(
+                        f"The name **{player_name}** is already taken by another player.\n"
+                        "Please choose a different name."
+                    ),
+                    color=discord.Color.red()
                 )
-                if duplicate_name:
-                    logging.info(f"User {user_name} (ID: {user_id}) tried to use a duplicate name: {player_name}")
-                    duplicate_embed = discord.Embed(
-                        title="❌ **Duplicate Name**",
-                        description=(
-                            f"The name **{player_name}** is already taken by another player.\n"
-                            "Please choose a different name."
-                        ),
-                        color=discord.Color.red()
-                    )
-                    await ctx.send(embed=duplicate_embed)
-                    continue
-
-                # If no issues, break the loop
-                logging.info(f"User {user_name} (ID: {user_id}) selected the name: {player_name}")
-                break
-            except asyncio.TimeoutError:
-                logging.warning(f"Signup timed out for user: {user_name} (ID: {user_id})")
-                await self.send_timeout_embed(ctx)
+                await interaction.response.send_message(embed=duplicate_embed, ephemeral=True)
                 return
 
-        # Step 2: Confirm the name
-        confirmation_embed = discord.Embed(
-            title="✅ **Confirm Your Name**",
-            description=f"Do you want to sign up with **{player_name}**?",
-            color=discord.Color.blue()
-        )
-        confirmation_embed.set_footer(text="React with ✅ to confirm or ❌ to cancel.")
-        confirmation_message = await ctx.send(embed=confirmation_embed)
-        await confirmation_message.add_reaction('✅')
-        await confirmation_message.add_reaction('❌')
+            logging.info(f"User {user_name} (ID: {user_id}) selected the name: {player_name}")
+            state['player_name'] = player_name
+            if not await advance_session(session, 'confirm', state):
+                await interaction.response.defer()  # Another click already moved the wizard on
+                return
 
-        try:
-            reaction, user = await self.bot.wait_for(
-                'reaction_add',
-                timeout=calculate_time_remaining(),
-                check=lambda r, u: u == ctx.author and r.message.id == confirmation_message.id and str(r.emoji) in ['✅', '❌']
+            # Step 2: Confirm the name
+            confirmation_embed = discord.Embed(
+                title="✅ **Confirm Your Name**",
+                description=f"Do you want to sign up with **{player_name}**?",
+                color=discord.Color.blue()
             )
-
-            if str(reaction.emoji) == '❌':
-                logging.info(f"User {user_name} (ID: {user_id}) canceled the signup.")
-                await ctx.send(embed=self.canceled_embed())
+            confirmation_embed.set_footer(text="Press ✅ to confirm or ❌ to cancel.")
+            await interaction.response.edit_message(embed=confirmation_embed, view=wizard_buttons(session_id, [
+                ("Confirm", '✅', 'confirm', 'yes'),
+                ("Cancel", '❌', 'confirm', 'no'),
+            ]))
+
+        elif session['step'] == 'confirm' and action == 'confirm' and value == 'no':
+            if not await end_session(session):
+                await interaction.response.defer()
                 return
-        except asyncio.TimeoutError:
-            logging.warning(f"Signup timed out for user: {user_name} (ID: {user_id}) during confirmation.")
-            await self.send_timeout_embed(ctx)
-            return
+            logging.info(f"User {user_name} (ID: {user_id}) canceled the signup.")
+            await interaction.response.edit_message(embed=self.canceled_embed(), view=None)
 
-        # Step 3: Select player's level
-        level_embed = discord.Embed(
-            title="🎚️ **Select Your Level**",
-            description=(
-                "Please react with your level:\n\n"
-                "1️⃣ - **Beginner**\n"
-                "2️⃣ - **Intermediate**\n"
-                "3️⃣ - **Advanced**"
-            ),
-            color=discord.Color.blue()
-        )
-        level_embed.set_footer(text="React with 1️⃣, 2️⃣, or 3️⃣.")
-        level_message = await ctx.send(embed=level_embed)
-        await level_message.add_reaction('1️⃣')
-        await level_message.add_reaction('2️⃣')
-        await level_message.add_reaction('3️⃣')
+        elif session['step'] == 'confirm' and action == 'confirm':
+            if not await advance_session(session, 'level'):
+                await interaction.response.defer()
+                return
 
-        try:
-            reaction, user = await self.bot.wait_for(
-                'reaction_add',
-                timeout=calculate_time_remaining(),
-                check=lambda r, u: u == ctx.author and r.message.id == level_message.id and str(r.emoji) in ['1️⃣', '2️⃣', '3️⃣']
+            # Step 3: Select player's level
+            level_embed = discord.Embed(
+                title="🎚️ **Select Your Level**",
+                description=(
+                    "Please select your level:\n\n"
+                    "1️⃣ - **Beginner**\n"
+                    "2️⃣ - **Intermediate**\n"
+                    "3️⃣ - **Advanced**"
+                ),
+                color=discord.Color.blue()
             )
+            level_embed.set_footer(text="Press 1️⃣, 2️⃣, or 3️⃣.")
+            await interaction.response.edit_message(embed=level_embed, view=wizard_buttons(session_id, [
+                ("Beginner", '1️⃣', 'level', '1'),
+                ("Intermediate", '2️⃣', 'level', '2'),
+                ("Advanced", '3️⃣', 'level', '3'),
+            ]))
+
+        elif session['step'] == 'level' and action == 'level' and value in SIGNUP_LEVELS:
+            if not await end_session(session):
+                await interaction.response.defer()
+                return
+            elo, level = SIGNUP_LEVELS[value]
+            logging.info(f"User {user_name} (ID: {user_id}) selected level: {level} (ELO: {elo})")
+            # Signing up takes a few round trips, so acknowledge the click first
+            await interaction.response.defer()
+            await self.finish_signup(interaction, state['player_name'], elo, level)
 
-            if str(reaction.emoji) == '1️⃣':
-                elo, level = 500, 'Beginner'
-            elif str(reaction.emoji) == '2️⃣':
-                elo, level = 1000, 'Intermediate'
-            elif str(reaction.emoji) == '3️⃣':
-                elo, level = 1000, 'Advanced'
+        else:
+            # A click on a step the session has already moved past
+            await interaction.response.defer()
 
-            logging.info(f"User {user_name} (ID: {user_id}) selected level: {level} (ELO: {elo})")
-        except asyncio.TimeoutError:
-            logging.warning(f"Signup timed out for user: {user_name} (ID: {user_id}) during level selection.")
-            await self.send_timeout_embed(ctx)
-            return
+    async def handle_expiry(self, session):
+        """
+        Tells the user that their signup timed out.
+        """
+        logging.warning(f"Signup timed out for user ID {session['user_id']} during step: {session['step']}")
+        channel = self.bot.get_channel(session['channel_id']) if session['channel_id'] else None
+        if channel is not None:
+            await channel.send(f"<@{session['user_id']}>", embed=self.timeout_embed())
+
+    async def finish_signup(self, interaction, player_name, elo, level):
+        """
+        Adds the player to the database and turns the wizard message into the final summary.
+        """
+        guild = interaction.guild
+        member = interaction.user
+        guild_id, user_id, user_name = guild.id, member.id, member.name
 
         # Step 4: Add player to the database
+        ranked_roles_before = await snapshot_ranked_roles(guild_id)
         try:
-            execute_query(
-                "INSERT INTO players (discord_user_id, guild_id, player_name, elo) VALUES (%s, %s, %s, %s)",
-                (user_id, guild_id, player_name, elo)
+            new_player = await async_fetch_query(
+                "INSERT INTO players (discord_user_id, guild_id, player_name, elo, base_elo, glicko_rating) VALUES (%s, %s, %s, %s, %s, %s) RETURNING player_id",
+                (user_id, guild_id, player_name, elo, elo, elo)
             )
+            index_player(guild_id, new_player[0]['player_id'], elo, user_id, player_name)
+            invalidate_players(guild_id, [new_player[0]['player_id']])
+            await queue_rank_changes(guild, ranked_roles_before, [new_player[0]['player_id']])
             logging.info(f"User {user_name} (ID: {user_id}) successfully signed up with name: {player_name}, ELO: {elo}, Level: {level}")
         except Exception as e:
             logging.error(f"Failed to insert user {user_name} (ID: {user_id}) into database: {e}")
-            await ctx.send("An error occurred while completing your signup. Please contact an admin.")
+            await interaction.edit_original_response(
+                content="An error occurred while completing your signup. Please contact an admin.", embed=None, view=None
+            )
             return
 
         # Attempt to change the user's nickname
         try:
-            await ctx.author.edit(nick=player_name)
+            await member.edit(nick=player_name)
             nickname_message = f"Your nickname has been changed to **{player_name}**."
         except discord.Forbidden:
             logging.warning(f"Bot lacks permission to change nickname for user {user_name} (ID: {user_id}).")
             nickname_message = "I do not have permission to change your nickname."
-            await self.notify_admins_nickname(ctx, player_name)
+            await self.notify_admins_nickname(guild, member, player_name)
 
         # Send signup success message
         success_embed = discord.Embed(
@@ -204,39 +223,54 @@ class Signup(commands.Cog):
             ),
             color=discord.Color.green()
         )
-        await ctx.send(embed=success_embed)
+        await interaction.edit_original_response(embed=success_embed, view=None)
 
         # Notify admins if "Advanced"
         if level == 'Advanced':
-            await self.notify_admins(ctx, player_name)
+            await self.notify_admins(guild, member, player_name)
+
+    # Embed for the name step
+    def name_embed(self):
+        return discord.Embed(
+            title="📝 **Signup Process**",
+            description=(
+                "Press **Enter name** and input your name in the format:\n"
+                "**(FirstName)(LastInitial)**\n\n"
+                "**Examples:**\n"
+                "• DwayneJ\n"
+                "• ClarkK\n"
+                "• MarieC"
+            ),
+            color=discord.Color.blue()
+        ).set_footer(text=f"You have {SIGNUP_TIMEOUT} seconds to complete the signup.")
 
     # Helper method to notify admins about failed nickname change
-    async def notify_admins_nickname(self, ctx, player_name):
-        admin_role = discord.utils.get(ctx.guild.roles, name=ADMIN_ROLE_NAME)
+    async def notify_admins_nickname(self, guild, member, player_name):
+        admin_role = discord.utils.get(guild.roles, name=ADMIN_ROLE_NAME)
         if admin_role:
             for admin in admin_role.members:
                 try:
                     dm_embed = discord.Embed(
                         title="🚨 **Nickname Change Required**",
                         description=(
-                            f"{ctx.author.mention} ({ctx.author.name}) attempted to sign up with the name "
+                            f"{member.mention} ({member.name}) attempted to sign up with the name "
                             f"**{player_name}**, but I could not change their nickname due to insufficient permissions.\n\n"
                             "Please manually update their nickname to follow server guidelines."
                         ),
                         color=discord.Color.orange()
                     )
-                    dm_embed.set_footer(text=f"Guild: {ctx.guild.name}")
+                    dm_embed.set_footer(text=f"Guild: {guild.name}")
                     await admin.send(embed=dm_embed)
                 except discord.Forbidden:
                     pass  # Admin has disabled DMs from the server
 
     # Helper method to notify admins about advanced signup
-    async def notify_admins(self, ctx, player_name):
-        admin_role = discord.utils.get(ctx.guild.roles, name=ADMIN_ROLE_NAME)
+    async def notify_admins(self, guild, member, player_name):
+        admin_role = discord.utils.get(guild.roles, name=ADMIN_ROLE_NAME)
         if admin_role:
             for admin in admin_role.members:
                 try:
-                    await admin.send(embed=self.advanced_signup_embed(ctx.author, player_name))
+                    await admin.send(embed=self.advanced_signup_embed(member, player_name))
                 except discord.Forbidden:
                     pass
 
@@ -251,6 +285,14 @@ class Signup(commands.Cog):
             color=discord.Color.orange()
         )
 
+    # Embed for signup timeout
+    def timeout_embed(self):
+        return discord.Embed(
+            title="⏳ **Signup Timed Out**",
+            description="You took too long to respond. Please start the signup process again.",
+            color=discord.Color.red()
+        )
+
     # Embed for signup cancellation
     def canceled_embed(self):
         return discord.Embed(
@@ -259,15 +301,6 @@ class Signup(commands.Cog):
             color=discord.Color.red()
         )
 
-    # Embed for signup timeout
-    async def send_timeout_embed(self, ctx):
-        timeout_embed = discord.Embed(
-            title="⏳ **Signup Timed Out**",
-            description="You took too long to respond. Please start the signup process again.",
-            color=discord.Color.red()
-        )
-        await ctx.send(embed=timeout_embed)
-
     # Embed for invalid name
     def invalid_name_embed(self):
         return discord.Embed(
@@ -1,10 +1,25 @@
 import discord
 from discord.ext import commands, tasks
+import asyncio
 import os
+import signal
+import subprocess
+import sys
+import time
 import logging
 from dotenv import load_dotenv
-from utils.db import fetch_query, execute_query
-from utils.role_update import update_player_roles
+from utils.db import async_execute_query, open_async_pool
+from utils.role_update import prewarm_roles
+from utils.role_queue import role_update_queue
+from utils.role_registry import invalidate_role_registry
+from utils.migrations import apply_migrations
+from utils.rank_index import get_rank_index
+from utils.glicko import close_rating_period
+from utils.paginator import dispatch_paginator
+from utils.wizard import dispatch_wizard, expire_sessions
+from utils.sharding import (
+    WORKER_PROCESSES, is_sharded, is_supervisor, local_shard_ids, shard_count, shard_for_guild, worker_shard_ranges
+)
 
 # Load environment variables from .env
 load_dotenv()
@@ -24,7 +39,55 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Sharded deployments run an AutoShardedBot; see utils/sharding.py for the settings
+BotBase = commands.AutoShardedBot if is_sharded() else commands.Bot
+
+
+class ShogiBot(BotBase):
+    """
+    Bot whose one-time startup (database, migrations, cogs, background tasks) runs in
+    `setup_hook`, which discord.py calls once per process. `on_ready`, which fires again
+    after every reconnect, only prepares guilds that have not been prepared yet.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_guilds = set()  # IDs of guilds that have been chunked and prewarmed
+        self.startup_complete = asyncio.Event()  # Set once the first on_ready has prepared every guild
+
+    async def setup_hook(self):
+        phase_start = time.perf_counter()
+        await open_async_pool()
+        await apply_migrations()  # Bring the schema up to date before any cog touches it
+        logging.info(f"Startup: database ready in {time.perf_counter() - phase_start:.2f}s")
+
+        phase_start = time.perf_counter()
+        await load_cogs()  # Load command cogs once per process
+        logging.info(f"Startup: cogs loaded in {time.perf_counter() - phase_start:.2f}s")
+
+        if is_sharded():
+            logging.info(f"Running shards {self.shard_ids or 'all'} of {self.shard_count or 'auto'}")
+
+        # The tasks wait for startup_complete before their first run
+        update_roles_task.start()
+        close_rating_periods_task.start()
+        expire_wizard_sessions_task.start()
+
+    def owns_guild(self, guild):
+        """
+        Returns True if this process's shards serve the guild, so its background work
+        (role sweeps, rating periods) runs in exactly one process.
+        """
+        shard_ids = getattr(self, 'shard_ids', None)  # Only AutoShardedBot has shard_ids
+        if shard_ids is None or not self.shard_count:
+            return True
+        return shard_for_guild(guild.id, self.shard_count) in shard_ids
+
+# Members are chunked by the startup pipeline below, a few guilds at a time
+bot_options = {'command_prefix': '!', 'intents': intents, 'chunk_guilds_at_startup': False}
+if is_sharded():
+    bot_options.update(shard_count=shard_count(), shard_ids=local_shard_ids())
+bot = ShogiBot(**bot_options)
 
 
 
@@ -41,79 +104,225 @@ async def load_cogs():
             except Exception as e:
                 logging.error(f"Failed to load cog {filename}: {e}")
 
+# Register guilds in the database
+async def register_guilds(guilds):
+    """
+    Ensure every given guild is present in the database with one bulk upsert.
+    """
+    guilds = list(guilds)
+    if not guilds:
+        return
+    try:
+        await async_execute_query(
+            """
+            INSERT INTO guilds (guild_id, guild_name)
+            SELECT * FROM unnest(%s::bigint[], %s::text[])
+            ON CONFLICT (guild_id) DO UPDATE SET guild_name = EXCLUDED.guild_name
+            """,
+            ([guild.id for guild in guilds], [guild.name for guild in guilds])
+        )
+    except Exception as e:
+        logging.error(f"Failed to register {len(guilds)} guilds in the database: {e}")
+
 # Ensure guild exists in the database
 async def ensure_guild_exists(guild):
     """
     Ensure a guild is present in the database.
     """
-    guild_data = fetch_query(
-        "SELECT guild_id FROM guilds WHERE guild_id = %s",
-        (guild.id,)
-    )
-    if not guild_data:
+    await register_guilds([guild])
+
+# Member chunking requests are sent over the gateway, so only a few run at once
+STARTUP_CHUNK_CONCURRENCY = 4
+
+async def prepare_guild(guild, semaphore):
+    """
+    Caches a guild's members and creates its missing ranking roles.
+    """
+    async with semaphore:
         try:
-            execute_query(
-                "INSERT INTO guilds (guild_id, guild_name) VALUES (%s, %s)",
-                (guild.id, guild.name)
-            )
-            logging.info(f"Added guild to database: {guild.name} (ID: {guild.id})")
+            if not guild.chunked:
+                await guild.chunk()
+            logging.info(f"Cached {guild.member_count} members for guild: {guild.name} (ID: {guild.id})")
+            # Create missing ranking and ELO bracket roles once, outside of any role update
+            rank_index = await get_rank_index(guild.id)
+            await prewarm_roles(guild, [player['elo'] for player in rank_index.players.values()])
+            bot.prepared_guilds.add(guild.id)
         except Exception as e:
-            logging.error(f"Failed to add guild {guild.name} (ID: {guild.id}) to database: {e}")
+            logging.error(f"Failed to prepare guild {guild.name} (ID: {guild.id}): {e}")
+
+# Full role sweep. Rank changes are queued as games are recorded, so this is only a safety net.
+ROLE_SWEEP_HOURS = 168
 
 # Background task to update roles
-@tasks.loop(hours=24)
+@tasks.loop(hours=ROLE_SWEEP_HOURS)
 async def update_roles_task():
     """
     Background task to update roles for all players in all guilds.
     """
-    await bot.wait_until_ready()
+    await bot.startup_complete.wait()
 
-    for guild in bot.guilds:
-        logging.info(f"Updating roles for guild: {guild.name} (ID: {guild.id})")
-        await ensure_guild_exists(guild)  # Ensure the guild exists in the database
+    guilds = [guild for guild in bot.guilds if bot.owns_guild(guild)]
+    await register_guilds(guilds)  # Ensure the guilds exist in the database
 
-        # Fetch all players for the current guild ordered by ELO descending
-        players = fetch_query(
-            "SELECT player_id, discord_user_id, elo FROM players WHERE guild_id = %s ORDER BY elo DESC",
-            params=(guild.id,)
-        )
+    # Guilds are processed concurrently under the scheduler's per-guild and global budgets
+    await role_update_queue.sweep(guilds)
 
-        rankings = {}
-        rank = 1
-        for player in players:
-            pid, discord_user_id, elo = player['player_id'], player['discord_user_id'], player['elo']
-            rankings[pid] = rank
-            rank += 1
+# Background task to close Glicko-2 rating periods. It checks hourly, and a guild's period is
+# only closed once it is RATING_PERIOD_LENGTH old, so restarts never close an extra short period.
+@tasks.loop(hours=1)
+async def close_rating_periods_task():
+    """
+    Background task that closes the daily Glicko-2 rating period for every guild that is due.
+    """
+    await bot.startup_complete.wait()
 
-        updated_members = 0
-        for player in players:
-            pid, discord_user_id, elo = player['player_id'], player['discord_user_id'], player['elo']
-            member = guild.get_member(discord_user_id)
-            if member:
-                rank = rankings[pid]
-                await update_player_roles(member, elo, rank)
-                updated_members += 1
+    for guild in bot.guilds:
+        if not bot.owns_guild(guild):
+            continue
+        try:
+            await close_rating_period(guild.id)
+        except Exception as e:
+            logging.error(f"Failed to close rating period for guild {guild.name} (ID: {guild.id}): {e}")
 
-        logging.info(f"Finished updating roles for {updated_members} members in guild: {guild.name}")
+# How often timed-out addgame/signup wizards are cleared and reported
+WIZARD_EXPIRY_SECONDS = 15
+
+# Background task to report timed-out wizards
+@tasks.loop(seconds=WIZARD_EXPIRY_SECONDS)
+async def expire_wizard_sessions_task():
+    """
+    Background task that deletes expired wizard sessions and posts their timeout notices.
+    """
+    await bot.startup_complete.wait()
+
+    try:
+        await expire_sessions([guild.id for guild in bot.guilds if bot.owns_guild(guild)])
+    except Exception as e:
+        logging.error(f"Failed to expire wizard sessions: {e}")
 
 # On bot ready
 @bot.event
 async def on_ready():
     """
-    Event triggered when the bot is ready.
+    Event triggered when the bot is ready. Fires again after every reconnect that could not
+    resume the session, so it only prepares guilds that have not been prepared yet.
     """
-    logging.info(f'Logged in as {bot.user.name}')
-    await load_cogs()  # Load command cogs when the bot is ready
+    guilds = [guild for guild in bot.guilds if guild.id not in bot.prepared_guilds]
+    if bot.startup_complete.is_set():
+        logging.info(f"Reconnected as {bot.user.name}; preparing {len(guilds)} new guilds.")
+    else:
+        logging.info(f'Logged in as {bot.user.name}')
+    if not guilds:
+        bot.startup_complete.set()
+        return
+
+    phase_start = time.perf_counter()
+    await register_guilds(guilds)
+    logging.info(f"Startup: {len(guilds)} guilds registered in {time.perf_counter() - phase_start:.2f}s")
+
+    phase_start = time.perf_counter()
+    semaphore = asyncio.Semaphore(STARTUP_CHUNK_CONCURRENCY)
+    await asyncio.gather(*(prepare_guild(guild, semaphore) for guild in guilds))
+    logging.info(f"Startup: guilds chunked and roles prewarmed in {time.perf_counter() - phase_start:.2f}s")
+
+    bot.startup_complete.set()
+
+# A resumed session replays missed events, so there is nothing to redo
+@bot.event
+async def on_resumed():
+    logging.info("Gateway session resumed.")
+
+# Commands can arrive before their guild has been chunked at startup
+@bot.before_invoke
+async def ensure_guild_chunked(ctx):
+    if ctx.guild and not ctx.guild.chunked:
+        await ctx.guild.chunk()
+
+# Register guilds the bot joins while running
+@bot.event
+async def on_guild_join(guild):
+    await ensure_guild_exists(guild)
+    await prepare_guild(guild, asyncio.Semaphore(1))
+
+# Paginator and wizard buttons keep their state in their custom_id (wizards in the database)
+# and are routed here, not to a view held in memory
+@bot.event
+async def on_interaction(interaction):
+    if not await dispatch_paginator(interaction):
+        await dispatch_wizard(interaction)
+
+# Keep the per-guild role registry in sync with role changes
+@bot.event
+async def on_guild_role_create(role):
+    invalidate_role_registry(role.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    invalidate_role_registry(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    invalidate_role_registry(after.guild.id)
+
+# Seconds a worker is given to shut down cleanly before it is killed
+WORKER_STOP_TIMEOUT = 30
+
+
+def run_workers():
+    """
+    Launches WORKER_PROCESSES copies of this script, each owning a contiguous shard range,
+    and waits for them. If one exits, or the supervisor receives SIGTERM or SIGINT, the
+    workers are stopped so that no shard is ever served by two processes.
+    """
+    # docker/systemd stop sends SIGTERM; turn it into the same shutdown path as Ctrl+C
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    total_shards = shard_count()
+    workers = []
+    try:
+        for first, last in worker_shard_ranges(total_shards, WORKER_PROCESSES):
+            env = dict(os.environ, SHARD_COUNT=str(total_shards), SHARD_IDS=f"{first}-{last}")
+            # Each worker gets its own process group, so its children are stopped with it
+            workers.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__)], env=env, start_new_session=True
+            ))
+            logging.info(f"Started worker for shards {first}-{last} of {total_shards} (PID {workers[-1].pid})")
+
+        while all(worker.poll() is None for worker in workers):
+            time.sleep(5)
+        logging.error("A worker process exited; stopping the remaining workers.")
+    except KeyboardInterrupt:
+        logging.info("Supervisor stopping; terminating workers.")
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)  # Finish stopping the workers even if signalled again
+        for worker in workers:
+            stop_worker(worker, signal.SIGTERM)
+        for worker in workers:
+            try:
+                worker.wait(timeout=WORKER_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                logging.warning(f"Worker {worker.pid} did not stop in {WORKER_STOP_TIMEOUT}s; killing it.")
+                stop_worker(worker, signal.SIGKILL)
+                worker.wait()
+
+
+def stop_worker(worker, sig):
+    """
+    Sends a signal to a worker's whole process group, if it is still running.
+    """
+    if worker.poll() is not None:
+        return
+    try:
+        os.killpg(worker.pid, sig)
+    except ProcessLookupError:
+        pass
 
-    for guild in bot.guilds:
-        await ensure_guild_exists(guild)
-        # Force caching of all members in the guild
-        await guild.chunk()
-        logging.info(f"Cached members for guild: {guild.name} (ID: {guild.id})")
-        logging.info(f"Cached members for guild: {guild.name} (ID: {guild.id})")
-        member_ids = [member.id for member in guild.members]
-        logging.info(f"Cached member IDs for {guild.name}: {member_ids}")
-    update_roles_task.start()  # Start the background task
 
 # Run the bot
-bot.run(BOT_TOKEN)
+if __name__ == '__main__':
+    if is_supervisor():
+        run_workers()
+    else:
+        bot.run(BOT_TOKEN)
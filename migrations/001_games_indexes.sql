@@ -0,0 +1,11 @@
+-- Hot-path indexes for the games table.
+-- !history (ALL) filters on guild_id and pages newest first.
+CREATE INDEX IF NOT EXISTS idx_games_guild_date
+    ON games (guild_id, date_played DESC, game_id DESC);
+
+-- !history <player> looks up each side of the game separately.
+CREATE INDEX IF NOT EXISTS idx_games_player1_date
+    ON games (player1_id, date_played DESC, game_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_games_player2_date
+    ON games (player2_id, date_played DESC, game_id DESC);
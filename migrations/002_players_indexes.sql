@@ -0,0 +1,10 @@
+-- Hot-path indexes for the players table.
+-- Leaderboard, rankings and the role sweep read a guild's players ordered by ELO.
+-- The INCLUDE columns let those reads be served from the index alone.
+CREATE INDEX IF NOT EXISTS idx_players_guild_elo
+    ON players (guild_id, elo DESC, player_id DESC)
+    INCLUDE (player_name, discord_user_id);
+
+-- Name lookups used by !addgame, !profile, !history and the admin commands.
+CREATE INDEX IF NOT EXISTS idx_players_guild_name
+    ON players (guild_id, player_name);
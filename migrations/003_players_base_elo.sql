@@ -0,0 +1,6 @@
+-- Starting rating of each player, used as the seed when ratings are replayed from the games table.
+-- Players without games start from their current rating. For players that already have games the
+-- signup rating was never recorded, so they fall back to the schema default.
+ALTER TABLE players ADD COLUMN IF NOT EXISTS base_elo INT NOT NULL DEFAULT 1200;
+
+UPDATE players SET base_elo = elo WHERE games_played = 0 AND elo IS NOT NULL;
@@ -0,0 +1,17 @@
+-- Per-game rating ledger: each player's ELO before and after a game and the counter deltas it caused.
+-- Lets !removegame revert a game without replaying the whole guild.
+CREATE TABLE IF NOT EXISTS rating_ledger (
+    ledger_id SERIAL PRIMARY KEY,
+    game_id INT NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    guild_id BIGINT REFERENCES guilds(guild_id) ON DELETE CASCADE,
+    player_id INT REFERENCES players(player_id) ON DELETE CASCADE,
+    elo_before INT NOT NULL,
+    elo_after INT NOT NULL,
+    wins_delta INT NOT NULL DEFAULT 0,
+    losses_delta INT NOT NULL DEFAULT 0,
+    draws_delta INT NOT NULL DEFAULT 0,
+    UNIQUE (game_id, player_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rating_ledger_guild ON rating_ledger (guild_id);
+CREATE INDEX IF NOT EXISTS idx_rating_ledger_player ON rating_ledger (player_id);
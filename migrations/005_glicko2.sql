@@ -0,0 +1,21 @@
+-- Glicko-2 rating state per player. Existing players are seeded from their current ELO
+-- with the default (maximum) rating deviation, so their first rating period settles them quickly.
+ALTER TABLE players
+    ADD COLUMN IF NOT EXISTS glicko_rating DOUBLE PRECISION NOT NULL DEFAULT 1500,
+    ADD COLUMN IF NOT EXISTS glicko_rd DOUBLE PRECISION NOT NULL DEFAULT 350,
+    ADD COLUMN IF NOT EXISTS glicko_volatility DOUBLE PRECISION NOT NULL DEFAULT 0.06;
+
+UPDATE players SET glicko_rating = elo WHERE elo IS NOT NULL;
+
+-- One row per closed rating period; the latest period_end is where the next period starts.
+CREATE TABLE IF NOT EXISTS rating_periods (
+    period_id SERIAL PRIMARY KEY,
+    guild_id BIGINT REFERENCES guilds(guild_id) ON DELETE CASCADE,
+    period_start TIMESTAMP,
+    period_end TIMESTAMP NOT NULL,
+    games_count INT NOT NULL DEFAULT 0,
+    players_count INT NOT NULL DEFAULT 0,
+    closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_rating_periods_guild_end ON rating_periods (guild_id, period_end DESC);
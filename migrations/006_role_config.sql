@@ -0,0 +1,31 @@
+-- Per-guild ranking role configuration. `top_rank` roles go to players ranked at or above
+-- their threshold (the smallest matching threshold wins); `elo_benchmark` roles go to players
+-- whose ELO is at or above their threshold (the largest matching threshold wins).
+ALTER TABLE roles
+    ADD COLUMN IF NOT EXISTS color INT;
+
+DELETE FROM roles a USING roles b
+WHERE a.guild_id = b.guild_id AND a.role_name = b.role_name AND a.role_id > b.role_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_roles_guild_name ON roles (guild_id, role_name);
+
+-- Seed every existing guild with the defaults the bot used to hard-code
+INSERT INTO roles (guild_id, role_name, role_type, threshold, color)
+SELECT g.guild_id, d.role_name, 'top_rank', d.threshold, d.color
+FROM guilds g
+CROSS JOIN (VALUES ('Rank 1', 1, 15844367), ('Rank 2', 2, 12632256),
+                   ('Rank 3', 3, 13467442), ('Top 10', 10, 3447003)) AS d(role_name, threshold, color)
+ON CONFLICT (guild_id, role_name) DO NOTHING;
+
+INSERT INTO roles (guild_id, role_name, role_type, threshold)
+SELECT g.guild_id, t::text, 'elo_benchmark', t
+FROM guilds g
+CROSS JOIN generate_series(100, 3900, 100) AS t
+ON CONFLICT (guild_id, role_name) DO NOTHING;
+
+-- What the bot last assigned to each player; one row per (player, role)
+DELETE FROM player_roles a USING player_roles b
+WHERE a.player_id = b.player_id AND a.role_id = b.role_id AND a.player_role_id > b.player_role_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_player_roles_player_role ON player_roles (player_id, role_id);
+CREATE INDEX IF NOT EXISTS idx_player_roles_role ON player_roles (role_id);
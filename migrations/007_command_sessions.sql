@@ -0,0 +1,12 @@
+-- One row per user with a command in progress in a guild (guild_id 0 for DMs).
+-- Shared by every bot process; rows past expires_at are stale and can be taken over.
+CREATE TABLE IF NOT EXISTS command_sessions (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    token TEXT NOT NULL,
+    command_name TEXT,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_command_sessions_expires ON command_sessions (expires_at);
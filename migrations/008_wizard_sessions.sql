@@ -0,0 +1,16 @@
+-- In-flight addgame/signup wizards. Each button carries its session_id, so any bot process,
+-- including one started after a restart, can resume the wizard from here.
+-- A user has at most one wizard per guild; rows past expires_at are stale.
+CREATE TABLE IF NOT EXISTS wizard_sessions (
+    session_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    step TEXT NOT NULL,
+    state JSONB NOT NULL DEFAULT '{}',
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (guild_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_wizard_sessions_expires ON wizard_sessions (expires_at);
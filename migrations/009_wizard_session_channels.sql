@@ -0,0 +1,2 @@
+-- Channel each wizard was started in, so an expired session can post its timeout notice there.
+ALTER TABLE wizard_sessions ADD COLUMN IF NOT EXISTS channel_id BIGINT;
@@ -0,0 +1,13 @@
+-- Whether base_elo is known to reproduce the player's current ELO when their games are replayed.
+-- Players who already had games when base_elo was added were given the schema default instead of
+-- their real starting rating, so they are calibrated (utils/replay.py) before their guild's first
+-- full replay. Players created since record their signup rating and start out calibrated.
+ALTER TABLE players ADD COLUMN IF NOT EXISTS base_elo_calibrated BOOLEAN NOT NULL DEFAULT TRUE;
+
+UPDATE players SET base_elo_calibrated = FALSE
+WHERE games_played > 0
+  AND EXISTS (
+      SELECT 1 FROM games g
+      WHERE (g.player1_id = players.player_id OR g.player2_id = players.player_id)
+        AND NOT EXISTS (SELECT 1 FROM rating_ledger l WHERE l.game_id = g.game_id)
+  );
@@ -0,0 +1,12 @@
+-- !history pages on a (date_played, game_id) keyset, which cannot reach rows with a NULL date.
+-- Undated games sorted last in a replay (NULLS LAST), so they are given their guild's latest
+-- game date to keep that order.
+UPDATE games g
+SET date_played = COALESCE(
+    (SELECT MAX(date_played) FROM games latest WHERE latest.guild_id = g.guild_id),
+    CURRENT_TIMESTAMP
+)
+WHERE date_played IS NULL;
+
+ALTER TABLE games ALTER COLUMN date_played SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE games ALTER COLUMN date_played SET NOT NULL;
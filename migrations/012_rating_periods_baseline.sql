@@ -0,0 +1,7 @@
+-- Existing players were seeded with glicko_rating = elo, which already reflects every game they
+-- have played. Without a closed period, the first close would rate the whole game history again on
+-- top of that. A baseline period ending now makes the first close rate only new games.
+INSERT INTO rating_periods (guild_id, period_start, period_end, games_count, players_count)
+SELECT g.guild_id, NULL, NOW()::timestamp, 0, 0
+FROM guilds g
+WHERE NOT EXISTS (SELECT 1 FROM rating_periods rp WHERE rp.guild_id = g.guild_id);
@@ -1,9 +1,12 @@
 import os
 import sys
 import logging
-from psycopg_pool import ConnectionPool
+import uuid
+from contextlib import asynccontextmanager
+from psycopg_pool import AsyncConnectionPool
 from psycopg.rows import dict_row
 from config import DATABASE_CONFIG
+from utils.sharding import pool_max_size
 
 # Add the root directory (ShogiBotRP) to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -11,22 +14,35 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Initialize logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize the connection pool
-try:
-    pool = ConnectionPool(
-        conninfo=" ".join(f"{k}={v}" for k, v in DATABASE_CONFIG.items()),
-        min_size=1,  # Minimum number of connections in the pool
-        max_size=10,  # Maximum number of connections in the pool
-    )
-    logging.info("Database connection pool initialized successfully.")
-except Exception as e:
-    logging.error(f"Failed to initialize the database connection pool: {e}")
-    raise
-
-def execute_query(query, params=None, guild_id=None, debug=False):
+# The bot's only connection pool, so pool_max_size() is this process's whole share of
+# DB_POOL_MAX_SIZE. It cannot open connections until an event loop is running, so it is
+# created closed and opened at bot startup (the supervisor process never opens it).
+async_pool = AsyncConnectionPool(
+    conninfo=" ".join(f"{k}={v}" for k, v in DATABASE_CONFIG.items()),
+    min_size=1,
+    max_size=pool_max_size(),
+    open=False,
+)
+
+
+async def open_async_pool():
+    """
+    Opens the async connection pool. Must be called from within the running event loop.
+    """
+    await async_pool.open()
+    logging.info("Async database connection pool initialized successfully.")
+
+
+async def close_async_pool():
+    """
+    Closes the async connection pool.
+    """
+    await async_pool.close()
+
+async def async_execute_query(query, params=None, guild_id=None, debug=False):
     """
     Executes a query that modifies the database (e.g., INSERT, UPDATE, DELETE).
-    Includes optional `guild_id` parameter for multi-guild support.
+    Runs on the async pool so the event loop is never blocked while waiting on the database.
 
     :param query: SQL query to execute.
     :param params: Query parameters.
@@ -37,20 +53,19 @@ def execute_query(query, params=None, guild_id=None, debug=False):
         params = tuple(params or ()) + (guild_id,)
 
     try:
-        with pool.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+        async with async_pool.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
             if debug:
                 logging.debug(f"Executing query: {query} with params: {params}")
-            cursor.execute(query, params)
+            await cursor.execute(query, params)
             logging.info(f"Query executed successfully: {query}")
     except Exception as e:
         logging.error(f"Error executing query: {query} with params: {params}. Error: {e}")
         raise
 
 
-def fetch_query(query, params=None, guild_id=None, debug=False):
+async def async_fetch_query(query, params=None, guild_id=None, debug=False):
     """
-    Fetches data from the database (e.g., SELECT queries).
-    Includes optional `guild_id` parameter for multi-guild support.
+    Fetches data from the database (e.g., SELECT queries). Returns the rows as dicts.
 
     :param query: SQL query to execute.
     :param params: Query parameters.
@@ -62,11 +77,11 @@ def fetch_query(query, params=None, guild_id=None, debug=False):
         params = tuple(params or ()) + (guild_id,)
 
     try:
-        with pool.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+        async with async_pool.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
             if debug:
                 logging.debug(f"Executing query: {query} with params: {params}")
-            cursor.execute(query, params)
-            result = cursor.fetchall()
+            await cursor.execute(query, params)
+            result = await cursor.fetchall()
             logging.info(f"Query executed successfully: {query}")
             if debug:
                 logging.debug(f"Query result: {result}")
@@ -75,3 +90,92 @@ def fetch_query(query, params=None, guild_id=None, debug=False):
         logging.error(f"Error executing query: {query} with params: {params}. Error: {e}")
         raise
 
+
+
+async def stream_query(query, params=None, guild_id=None, chunk_size=1000, debug=False):
+    """
+    Streams the result of a SELECT through a server-side cursor, yielding lists of
+    at most `chunk_size` dict rows. Only one chunk is held in memory at a time.
+
+    :param query: SQL query to execute.
+    :param params: Query parameters.
+    :param guild_id: Optional guild ID for multi-guild queries.
+    :param chunk_size: Number of rows fetched per round trip.
+    :param debug: If True, logs the query and parameters for debugging.
+    """
+    if guild_id:
+        params = tuple(params or ()) + (guild_id,)
+
+    try:
+        async with async_pool.connection() as conn, \
+                conn.cursor(name=f"stream_{uuid.uuid4().hex}", row_factory=dict_row) as cursor:
+            if debug:
+                logging.debug(f"Streaming query: {query} with params: {params}")
+            cursor.itersize = chunk_size
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            logging.info(f"Query streamed successfully: {query}")
+    except Exception as e:
+        logging.error(f"Error streaming query: {query} with params: {params}. Error: {e}")
+        raise
+
+class Transaction:
+    """
+    A unit of work bound to a single pooled connection.
+    Writes queued with `execute` are pipelined, so they reach the server in one
+    round trip and are committed together when the `transaction()` block exits.
+    """
+
+    def __init__(self, cursor, debug=False):
+        self.cursor = cursor
+        self.debug = debug
+
+    async def execute(self, query, params=None, guild_id=None):
+        """
+        Queues a query that modifies the database. Follows the same `guild_id`
+        convention as `async_execute_query`.
+        """
+        if guild_id:
+            params = tuple(params or ()) + (guild_id,)
+        if self.debug:
+            logging.debug(f"Queueing query: {query} with params: {params}")
+        await self.cursor.execute(query, params)
+
+    async def fetch(self, query, params=None, guild_id=None):
+        """
+        Runs a query inside the transaction and returns its rows as dicts.
+        Fetching forces a pipeline sync, so batch reads before the writes that depend on them.
+        """
+        if guild_id:
+            params = tuple(params or ()) + (guild_id,)
+        if self.debug:
+            logging.debug(f"Executing query: {query} with params: {params}")
+        await self.cursor.execute(query, params)
+        return await self.cursor.fetchall()
+
+
+@asynccontextmanager
+async def transaction(pipeline=True, debug=False):
+    """
+    Opens a transaction on one pooled connection and yields a `Transaction`.
+    Everything executed through it is committed once on exit, or rolled back
+    if the block raises.
+
+    :param pipeline: If True, statements are sent in psycopg pipeline mode.
+    :param debug: If True, logs the queries and parameters for debugging.
+    """
+    try:
+        async with async_pool.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+            if pipeline:
+                async with conn.pipeline():
+                    yield Transaction(cursor, debug)
+            else:
+                yield Transaction(cursor, debug)
+        logging.info("Transaction committed successfully.")
+    except Exception as e:
+        logging.error(f"Transaction rolled back. Error: {e}")
+        raise
@@ -1,7 +1,19 @@
+import asyncio
 import logging
 from functools import wraps
+from utils.session_lock import session_lock, SESSION_LOCK_TTL
 
-active_commands = {}  # Global dictionary to track active commands
+
+async def _keep_session_alive(guild_id, user_id, token):
+    """
+    Refreshes a session lock until cancelled, so long-running commands keep their lock
+    while a crashed process's lock still expires after SESSION_LOCK_TTL.
+    """
+    while True:
+        await asyncio.sleep(SESSION_LOCK_TTL / 3)
+        if not await session_lock.refresh(guild_id, user_id, token):
+            logging.warning(f"Lost the command session lock for user {user_id} in guild {guild_id}.")
+            return
 
 
 def command_in_progress():
@@ -9,20 +21,26 @@ def command_in_progress():
         @wraps(func)
         async def wrapper(*args, **kwargs):
             ctx = args[1]  # Context is typically the second argument in a command
+            guild_id = ctx.guild.id if ctx.guild else None
             user_id = ctx.author.id
 
-            if user_id in active_commands:
+            token = await session_lock.acquire(guild_id, user_id, func.__name__)
+            if token is None:
                 await ctx.send(
                     "❌ You already have an active command running. Please finish it before starting another.")
                 return
 
-            active_commands[user_id] = True  # Mark the command as active
+            keep_alive = asyncio.create_task(_keep_session_alive(guild_id, user_id, token))
             try:
                 return await func(*args, **kwargs)
             finally:
-                active_commands.pop(user_id, None)  # Ensure cleanup after command finishes
+                keep_alive.cancel()
+                # Shielded so the lock is released even if this task is being cancelled
+                try:
+                    await asyncio.shield(session_lock.release(guild_id, user_id, token))
+                except Exception as e:
+                    logging.error(f"Failed to release the command session lock for user {user_id}: {e}")
 
         return wrapper
 
     return decorator
-
@@ -1,11 +1,15 @@
 # utils/elo.py
 
+# Sente's score for each stored result ('1-0' means sente won)
+SENTE_SCORES = {'1-0': 1, '0-1': 0, '0.5-0.5': 0.5}
+
+
 def calculate_new_ratings(player_rating, opponent_rating, player_score, opponent_score):
     """
-    Implements a simplified Glicko-2 rating calculation.
-    For full Glicko-2, consider using an existing library or implementing the full algorithm.
+    Applies the standard ELO formula to one game and returns both new ratings.
+    This is the per-game rating shown on the leaderboard; Glicko-2 ratings are
+    computed per rating period in utils/glicko.py.
     """
-    # Placeholder implementation using basic ELO formula
     k_factor = 32  # Adjust as needed
     expected_score = 1 / (1 + 10 ** ((opponent_rating - player_rating) / 400))
     new_player_rating = player_rating + k_factor * (player_score - expected_score)
@@ -14,3 +18,12 @@ def calculate_new_ratings(player_rating, opponent_rating, player_score, opponent
     new_opponent_rating = opponent_rating + k_factor * (opponent_score - expected_score_opponent)
 
     return int(new_player_rating), int(new_opponent_rating)
+
+
+def player1_score(result, player1_color):
+    """
+    Returns player 1's score (1, 0.5 or 0) for a game result.
+    Results are recorded from sente's point of view ('1-0' means sente won).
+    """
+    sente_score = SENTE_SCORES[result]
+    return sente_score if player1_color == 'sente' else 1 - sente_score
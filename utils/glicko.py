@@ -0,0 +1,211 @@
+# utils/glicko.py
+
+import logging
+import time
+from datetime import timedelta
+import numpy as np
+from utils.db import transaction
+from utils.elo import SENTE_SCORES
+from utils.player_cache import invalidate_guild_players
+
+# Glicko-2 system constants (Glickman, "Example of the Glicko-2 system")
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOLATILITY = 0.06
+TAU = 0.5  # Constrains how quickly volatility can change
+SCALE = 173.7178  # Converts between the Glicko and Glicko-2 scales
+CONVERGENCE_TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+# Games committed this close to a period's end may still be in flight, so they roll into the next period
+SETTLE_INTERVAL = '1 minute'
+
+# Length of a rating period. A close that comes sooner (e.g. right after a restart) is skipped
+RATING_PERIOD_LENGTH = timedelta(hours=24)
+
+
+def _g(phi):
+    return 1.0 / np.sqrt(1.0 + 3.0 * phi ** 2 / np.pi ** 2)
+
+
+def _expected(mu, mu_opponent, g_opponent):
+    return 1.0 / (1.0 + np.exp(-g_opponent * (mu - mu_opponent)))
+
+
+def _new_volatility(sigma, phi, v, delta):
+    """
+    Solves for the new volatility of every player at once with the Illinois algorithm
+    (step 5 of the Glicko-2 paper). All arguments are arrays of the same length.
+    """
+    a = np.log(sigma ** 2)
+    tau_sq = TAU ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta ** 2 - phi ** 2 - v - ex) / (2.0 * (phi ** 2 + v + ex) ** 2) - (x - a) / tau_sq
+
+    A = a.copy()
+    big_delta = delta ** 2 > phi ** 2 + v
+    B = np.where(big_delta, np.log(np.maximum(delta ** 2 - phi ** 2 - v, 1e-300)), a - TAU)
+
+    # For the remaining players step B down until f(B) >= 0
+    searching = ~big_delta & (f(B) < 0)
+    k = 1
+    while searching.any() and k < MAX_ITERATIONS:
+        k += 1
+        B = np.where(searching, a - k * TAU, B)
+        searching &= f(B) < 0
+
+    fA, fB = f(A), f(B)
+    for _ in range(MAX_ITERATIONS):
+        active = np.abs(B - A) > CONVERGENCE_TOLERANCE
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        crossed = fC * fB <= 0
+        A = np.where(active & crossed, B, A)
+        fA = np.where(active & crossed, fB, np.where(active, fA / 2.0, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+
+    return np.exp(A / 2.0)
+
+
+def rating_period(ratings, rds, volatilities, player1, player2, player1_scores):
+    """
+    Applies one Glicko-2 rating period to every player in a single vectorised pass.
+
+    :param ratings, rds, volatilities: per-player arrays at the start of the period.
+    :param player1, player2: positions (into the per-player arrays) of each game's players.
+    :param player1_scores: player 1's score in each game (1, 0.5 or 0).
+    :return: (ratings, rds, volatilities) after the period. Players without games keep
+             their rating and volatility, and their RD grows as Glicko-2 prescribes.
+    """
+    ratings = np.asarray(ratings, dtype=np.float64)
+    n_players = len(ratings)
+    mu = (ratings - DEFAULT_RATING) / SCALE
+    phi = np.asarray(rds, dtype=np.float64) / SCALE
+    sigma = np.asarray(volatilities, dtype=np.float64)
+
+    player1 = np.asarray(player1, dtype=np.int64)
+    player2 = np.asarray(player2, dtype=np.int64)
+    scores = np.asarray(player1_scores, dtype=np.float64)
+
+    # Every game is seen once from each side: (player, opponent, score)
+    players = np.concatenate([player1, player2])
+    opponents = np.concatenate([player2, player1])
+    game_scores = np.concatenate([scores, 1.0 - scores])
+
+    g_opponent = _g(phi[opponents])
+    expected = _expected(mu[players], mu[opponents], g_opponent)
+
+    v_inverse = np.bincount(players, weights=g_opponent ** 2 * expected * (1.0 - expected), minlength=n_players)
+    improvement = np.bincount(players, weights=g_opponent * (game_scores - expected), minlength=n_players)
+
+    new_mu, new_sigma = mu.copy(), sigma.copy()
+    new_phi = np.minimum(np.sqrt(phi ** 2 + sigma ** 2), DEFAULT_RD / SCALE)
+
+    played = v_inverse > 0
+    if played.any():
+        v = 1.0 / v_inverse[played]
+        delta = v * improvement[played]
+        sigma_played = _new_volatility(sigma[played], phi[played], v, delta)
+        phi_star = np.sqrt(phi[played] ** 2 + sigma_played ** 2)
+        phi_played = 1.0 / np.sqrt(1.0 / phi_star ** 2 + 1.0 / v)
+
+        new_sigma[played] = sigma_played
+        new_phi[played] = phi_played
+        new_mu[played] = mu[played] + phi_played ** 2 * improvement[played]
+
+    return new_mu * SCALE + DEFAULT_RATING, new_phi * SCALE, new_sigma
+
+
+async def close_rating_period(guild_id):
+    """
+    Closes a guild's current rating period: every game since the previous close is
+    rated in one Glicko-2 pass and all players are written back with one bulk UPDATE.
+
+    :return: dict with the number of players and games in the period, or None if the
+             previous period ended less than RATING_PERIOD_LENGTH ago.
+    """
+    start_time = time.perf_counter()
+
+    async with transaction(pipeline=False) as tx:
+        # Serialises period closes per guild without blocking game inserts (which take KEY SHARE)
+        await tx.fetch("SELECT guild_id FROM guilds WHERE guild_id = %s FOR NO KEY UPDATE", (guild_id,))
+
+        period = (await tx.fetch(
+            f"""
+            SELECT (SELECT MAX(period_end) FROM rating_periods WHERE guild_id = %s) AS period_start,
+                   NOW()::timestamp - INTERVAL '{SETTLE_INTERVAL}' AS period_end
+            """,
+            (guild_id,)
+        ))[0]
+        if period['period_start'] is not None and \
+                period['period_end'] - period['period_start'] < RATING_PERIOD_LENGTH:
+            return None
+
+        # Lock the guild's players in player_id order, the order every other rating write uses,
+        # so the bulk UPDATE below can neither deadlock with nor overwrite a concurrent game
+        players = await tx.fetch(
+            """
+            SELECT player_id, glicko_rating, glicko_rd, glicko_volatility
+            FROM players WHERE guild_id = %s ORDER BY player_id
+            FOR UPDATE
+            """,
+            (guild_id,)
+        )
+        if not players:
+            return {'players': 0, 'games': 0}
+
+        games = (await tx.fetch(
+            """
+            SELECT COALESCE(array_agg(player1_id), '{}') AS player1_ids,
+                   COALESCE(array_agg(player2_id), '{}') AS player2_ids,
+                   COALESCE(array_agg(player1_color = 'sente'), '{}') AS player1_is_sente,
+                   COALESCE(array_agg(result), '{}') AS results
+            FROM games
+            WHERE guild_id = %s AND date_played <= %s
+              AND (%s::timestamp IS NULL OR date_played > %s)
+            """,
+            (guild_id, period['period_end'], period['period_start'], period['period_start'])
+        ))[0]
+
+        player_ids = np.array([player['player_id'] for player in players], dtype=np.int64)
+        player1 = np.searchsorted(player_ids, np.asarray(games['player1_ids'], dtype=np.int64))
+        player2 = np.searchsorted(player_ids, np.asarray(games['player2_ids'], dtype=np.int64))
+        sente_scores = np.array([SENTE_SCORES[result] for result in games['results']], dtype=np.float64)
+        player1_scores = np.where(np.asarray(games['player1_is_sente'], dtype=bool), sente_scores, 1.0 - sente_scores)
+
+        ratings, rds, volatilities = rating_period(
+            [player['glicko_rating'] for player in players],
+            [player['glicko_rd'] for player in players],
+            [player['glicko_volatility'] for player in players],
+            player1, player2, player1_scores
+        )
+
+        await tx.execute(
+            """
+            UPDATE players p
+            SET glicko_rating = v.rating, glicko_rd = v.rd, glicko_volatility = v.volatility
+            FROM unnest(%s::int[], %s::float8[], %s::float8[], %s::float8[]) AS v(player_id, rating, rd, volatility)
+            WHERE p.player_id = v.player_id AND p.guild_id = %s
+            """,
+            (player_ids.tolist(), ratings.tolist(), rds.tolist(), volatilities.tolist(), guild_id)
+        )
+        await tx.execute(
+            """
+            INSERT INTO rating_periods (guild_id, period_start, period_end, games_count, players_count)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (guild_id, period['period_start'], period['period_end'], len(games['results']), len(players))
+        )
+
+    invalidate_guild_players(guild_id)
+    summary = {'players': len(players), 'games': len(games['results'])}
+    logging.info(
+        f"Closed Glicko-2 rating period for guild {guild_id}: {summary['games']} games, "
+        f"{summary['players']} players in {time.perf_counter() - start_time:.2f}s."
+    )
+    return summary
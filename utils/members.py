@@ -0,0 +1,30 @@
+# utils/members.py
+
+import discord
+from utils.player_cache import get_player
+
+
+async def resolve_player_name(guild_id, player_name):
+    """
+    Returns (player_id, discord_user_id) for a player name in a guild, or None if no such
+    player exists. Served from the player cache, which signup and removal keep current.
+    """
+    player = await get_player(guild_id, player_name=player_name)
+    if player is None:
+        return None
+    return player['player_id'], player['discord_user_id']
+
+
+async def resolve_member(guild: discord.Guild, user_id):
+    """
+    Returns the guild member with this user ID, or None if they are not in the guild.
+    The gateway member cache (filled when the guild is chunked) is checked first; the
+    REST API is only called on a cache miss.
+    """
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
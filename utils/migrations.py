@@ -0,0 +1,74 @@
+# utils/migrations.py
+
+import os
+import re
+import logging
+from utils.db import transaction
+
+MIGRATIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'migrations'))
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# Arbitrary key for pg_advisory_xact_lock so only one process migrates at a time
+MIGRATION_LOCK_KEY = 7_261_001
+
+
+def discover_migrations():
+    """
+    Returns the numbered migration files as (version, name, path) tuples, sorted by version.
+    Files must be named like `001_games_indexes.sql`.
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions found in {MIGRATIONS_DIR}")
+
+    return sorted(migrations)
+
+
+async def apply_migrations():
+    """
+    Applies every migration that has not been recorded in `schema_migrations` yet.
+    Each migration runs in its own transaction together with its bookkeeping row,
+    so a failed migration leaves no partial changes behind.
+    """
+    async with transaction(pipeline=False) as tx:
+        # Concurrent CREATE TABLE IF NOT EXISTS can still collide on the catalog, so take the lock first
+        await tx.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+        await tx.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+
+    applied_count = 0
+    for version, name, path in discover_migrations():
+        with open(path, encoding='utf-8') as f:
+            sql = f.read()
+
+        async with transaction(pipeline=False) as tx:
+            await tx.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+            already_applied = await tx.fetch(
+                "SELECT version FROM schema_migrations WHERE version = %s",
+                (version,)
+            )
+            if already_applied:
+                continue
+
+            logging.info(f"Applying migration {version:03d}_{name}")
+            await tx.execute(sql)
+            await tx.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            applied_count += 1
+
+    logging.info(f"Database migrations up to date ({applied_count} applied).")
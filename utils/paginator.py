@@ -0,0 +1,89 @@
+# utils/paginator.py
+
+import logging
+import discord
+
+# Paginator buttons carry all of their state in the custom_id:
+#   page:<kind>:<owner_id>:<page>:<cursor>
+# so an open paginator is just a message. Clicks are routed by `kind` to the renderer
+# registered for it; no view, listener or coroutine is kept per message.
+CUSTOM_ID_PREFIX = "page"
+
+_renderers = {}  # kind -> async render(interaction, page, cursor)
+
+
+def paginator(kind):
+    """
+    Registers a page renderer for a paginator kind.
+
+    The renderer is called as `await render(interaction, page, cursor)` and returns
+    (embed, previous_cursor, next_cursor) for that page, or None if the page no longer
+    exists. A cursor of None disables the corresponding button.
+    """
+    def decorator(render):
+        _renderers[kind] = render
+        return render
+    return decorator
+
+
+def page_buttons(kind, owner_id, page, previous_cursor, next_cursor):
+    """
+    Returns the previous/next buttons for a page. The view is stopped before it is sent,
+    so discord.py does not keep it in memory; clicks reach `dispatch_paginator` instead.
+    """
+    view = discord.ui.View(timeout=None)
+    for emoji, target, cursor in (("⬅️", page - 1, previous_cursor), ("➡️", page + 1, next_cursor)):
+        view.add_item(discord.ui.Button(
+            emoji=emoji,
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"{CUSTOM_ID_PREFIX}:{kind}:{owner_id}:{target}:{cursor or ''}",
+            disabled=cursor is None,
+        ))
+    view.stop()
+    return view
+
+
+async def send_paginator(ctx, kind, embed, previous_cursor=None, next_cursor=None, page=0):
+    """
+    Sends the first page of a paginator, with buttons only if there is more than one page.
+    """
+    if previous_cursor is None and next_cursor is None:
+        return await ctx.send(embed=embed)
+    return await ctx.send(embed=embed, view=page_buttons(kind, ctx.author.id, page, previous_cursor, next_cursor))
+
+
+async def dispatch_paginator(interaction: discord.Interaction):
+    """
+    Handles a paginator button click. Returns False if the interaction is not for a paginator.
+    """
+    if interaction.type != discord.InteractionType.component:
+        return False
+    custom_id = (interaction.data or {}).get('custom_id', '')
+    if not custom_id.startswith(f"{CUSTOM_ID_PREFIX}:"):
+        return False
+
+    try:
+        _, kind, owner_id, page, cursor = custom_id.split(':', 4)
+        owner_id, page = int(owner_id), int(page)
+    except ValueError:
+        logging.warning(f"Ignoring malformed paginator custom_id: {custom_id}")
+        return False
+
+    render = _renderers.get(kind)
+    if render is None:
+        return False
+
+    if interaction.user.id != owner_id:
+        await interaction.response.send_message("❌ These buttons are not for you.", ephemeral=True)
+        return True
+
+    result = await render(interaction, page, cursor or None)
+    if result is None:
+        await interaction.response.defer()
+        return True
+
+    embed, previous_cursor, next_cursor = result
+    await interaction.response.edit_message(
+        embed=embed, view=page_buttons(kind, owner_id, page, previous_cursor, next_cursor)
+    )
+    return True
@@ -0,0 +1,95 @@
+# utils/player_cache.py
+
+import os
+import time
+from collections import OrderedDict
+from utils.db import async_fetch_query
+
+# Bounded read-through cache of player rows, keyed by (guild_id, player_id) and reachable
+# by Discord user ID or player name. Every write to `players` must invalidate the rows it
+# touches; the TTL only bounds how long a missed invalidation could go unnoticed.
+PLAYER_CACHE_SIZE = int(os.getenv("PLAYER_CACHE_SIZE", "4096"))
+PLAYER_CACHE_TTL = int(os.getenv("PLAYER_CACHE_TTL", "300"))
+
+PLAYER_COLUMNS = (
+    "player_id, discord_user_id, player_name, elo, wins, losses, draws, games_played, "
+    "glicko_rating, glicko_rd"
+)
+
+_records = OrderedDict()  # (guild_id, player_id) -> (expires_at, record), least recently used first
+_by_user = {}  # (guild_id, discord_user_id) -> player_id
+_by_name = {}  # (guild_id, player_name) -> player_id
+_versions = {}  # guild_id -> number of invalidations seen, used to detect writes racing a load
+
+
+async def get_player(guild_id, discord_user_id=None, player_name=None):
+    """
+    Returns a player's row as a dict, looked up by Discord user ID or by player name,
+    or None if no such player exists. The dict is a copy, so callers may modify it.
+    """
+    if discord_user_id is not None:
+        player_id = _by_user.get((guild_id, discord_user_id))
+        column, value = "discord_user_id", discord_user_id
+    else:
+        player_id = _by_name.get((guild_id, player_name))
+        column, value = "player_name", player_name
+
+    key = (guild_id, player_id)
+    entry = _records.get(key)
+    if entry is not None:
+        expires_at, record = entry
+        if expires_at > time.monotonic():
+            _records.move_to_end(key)
+            return dict(record)
+        _drop(key)
+
+    version = _versions.get(guild_id, 0)
+    rows = await async_fetch_query(
+        f"SELECT {PLAYER_COLUMNS} FROM players WHERE {column} = %s AND guild_id = %s",
+        (value, guild_id)
+    )
+    if not rows:
+        return None
+
+    # A write that landed while the query was in flight may not be in its result
+    if _versions.get(guild_id, 0) == version:
+        _store(guild_id, rows[0])
+    return dict(rows[0])
+
+
+def _store(guild_id, record):
+    key = (guild_id, record['player_id'])
+    _drop(key)
+    _records[key] = (time.monotonic() + PLAYER_CACHE_TTL, record)
+    _by_user[(guild_id, record['discord_user_id'])] = record['player_id']
+    _by_name[(guild_id, record['player_name'])] = record['player_id']
+    while len(_records) > PLAYER_CACHE_SIZE:
+        _drop(next(iter(_records)))
+
+
+def _drop(key):
+    entry = _records.pop(key, None)
+    if entry is None:
+        return
+    guild_id, _ = key
+    record = entry[1]
+    _by_user.pop((guild_id, record['discord_user_id']), None)
+    _by_name.pop((guild_id, record['player_name']), None)
+
+
+def invalidate_players(guild_id, player_ids):
+    """
+    Drops the cached rows of players whose ratings, counters or identity have changed.
+    """
+    _versions[guild_id] = _versions.get(guild_id, 0) + 1
+    for player_id in player_ids:
+        _drop((guild_id, player_id))
+
+
+def invalidate_guild_players(guild_id):
+    """
+    Drops every cached row of a guild, after a write that touches all of its players.
+    """
+    _versions[guild_id] = _versions.get(guild_id, 0) + 1
+    for key in [key for key in _records if key[0] == guild_id]:
+        _drop(key)
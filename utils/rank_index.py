@@ -0,0 +1,232 @@
+# utils/rank_index.py
+
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from utils.db import async_fetch_query
+
+# Initial ELO span covered by the tree. It grows automatically if a rating falls outside it.
+DEFAULT_ELO_RANGE = (0, 4000)
+RANGE_PADDING = 500
+
+
+class GuildRankIndex:
+    """
+    Order-statistic index over one guild's players, ranked by ELO descending and
+    then player_id descending (the same order as `idx_players_guild_elo`).
+
+    A Fenwick tree counts players per ELO value, and each ELO value keeps its
+    players in a small sorted bucket to break ties. Rank lookups, range queries
+    and rating updates are all O(log E), where E is the ELO span.
+    """
+
+    def __init__(self, players=()):
+        self.players = {}  # player_id -> {'elo', 'discord_user_id', 'player_name'}
+        self.buckets = {}  # elo -> sorted list of -player_id
+        self.lo, self.hi = DEFAULT_ELO_RANGE
+        for player in players:
+            elo = player['elo']
+            if elo < self.lo:
+                self.lo = elo - RANGE_PADDING
+            if elo > self.hi:
+                self.hi = elo + RANGE_PADDING
+            self.players[player['player_id']] = {
+                'elo': elo,
+                'discord_user_id': player.get('discord_user_id'),
+                'player_name': player.get('player_name'),
+            }
+            insort(self.buckets.setdefault(elo, []), -player['player_id'])
+        self._rebuild()
+
+    def __len__(self):
+        return len(self.players)
+
+    def __contains__(self, player_id):
+        return player_id in self.players
+
+    def get(self, player_id):
+        """Returns the stored record for a player, or None."""
+        return self.players.get(player_id)
+
+    # Fenwick tree internals. Position 1 holds the highest ELO (self.hi).
+    def _position(self, elo):
+        return self.hi - elo + 1
+
+    def _elo_at(self, position):
+        return self.hi - position + 1
+
+    def _rebuild(self):
+        size = self.hi - self.lo + 1
+        tree = [0] * (size + 1)
+        for elo, bucket in self.buckets.items():
+            tree[self._position(elo)] += len(bucket)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.size = size
+
+    def _add(self, position, delta):
+        while position <= self.size:
+            self.tree[position] += delta
+            position += position & -position
+
+    def _prefix(self, position):
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+    def _select(self, k):
+        """Returns the smallest position whose prefix count is >= k."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position + 1
+
+    def _ensure_range(self, elo):
+        if elo < self.lo or elo > self.hi:
+            if elo < self.lo:
+                self.lo = elo - RANGE_PADDING
+            if elo > self.hi:
+                self.hi = elo + RANGE_PADDING
+            self._rebuild()
+
+    # Public API
+    def upsert(self, player_id, elo, discord_user_id=None, player_name=None):
+        """
+        Adds a player or moves an existing one to a new ELO.
+        Identity fields are only overwritten when given.
+        """
+        record = self.players.get(player_id)
+        if record:
+            if record['elo'] != elo:
+                self._discard(player_id, record['elo'])
+                self._insert(player_id, elo)
+                record['elo'] = elo
+            if discord_user_id is not None:
+                record['discord_user_id'] = discord_user_id
+            if player_name is not None:
+                record['player_name'] = player_name
+        else:
+            self._insert(player_id, elo)
+            self.players[player_id] = {
+                'elo': elo,
+                'discord_user_id': discord_user_id,
+                'player_name': player_name,
+            }
+
+    def remove(self, player_id):
+        """Removes a player from the index if present."""
+        record = self.players.pop(player_id, None)
+        if record:
+            self._discard(player_id, record['elo'])
+
+    def _insert(self, player_id, elo):
+        self._ensure_range(elo)
+        insort(self.buckets.setdefault(elo, []), -player_id)
+        self._add(self._position(elo), 1)
+
+    def _discard(self, player_id, elo):
+        bucket = self.buckets[elo]
+        del bucket[bisect_left(bucket, -player_id)]
+        if not bucket:
+            del self.buckets[elo]
+        self._add(self._position(elo), -1)
+
+    def rank(self, player_id):
+        """Returns the 1-based rank of a player, or None if they are not indexed."""
+        record = self.players.get(player_id)
+        if not record:
+            return None
+        elo = record['elo']
+        ahead = self._prefix(self._position(elo) - 1)
+        return ahead + bisect_left(self.buckets[elo], -player_id) + 1
+
+    def range(self, start, end):
+        """
+        Returns (rank, player_id, record) for every player ranked start..end (1-based, inclusive).
+        """
+        start = max(start, 1)
+        end = min(end, len(self.players))
+        results = []
+        rank = start
+        while rank <= end:
+            position = self._select(rank)
+            elo = self._elo_at(position)
+            bucket = self.buckets[elo]
+            offset = rank - self._prefix(position - 1) - 1
+            for negative_id in bucket[offset:offset + end - rank + 1]:
+                results.append((rank, -negative_id, self.players[-negative_id]))
+                rank += 1
+        return results
+
+
+_indexes = {}  # guild_id -> GuildRankIndex
+_versions = {}  # guild_id -> number of writes seen, used to detect writes racing a load
+_locks = {}  # guild_id -> asyncio.Lock guarding the initial load
+
+
+async def get_rank_index(guild_id):
+    """
+    Returns the rank index for a guild, loading it from the database on first use.
+    """
+    index = _indexes.get(guild_id)
+    if index is not None:
+        return index
+
+    lock = _locks.setdefault(guild_id, asyncio.Lock())
+    async with lock:
+        index = _indexes.get(guild_id)
+        if index is not None:
+            return index
+
+        while True:
+            version = _versions.get(guild_id, 0)
+            players = await async_fetch_query(
+                "SELECT player_id, discord_user_id, player_name, elo FROM players WHERE guild_id = %s",
+                (guild_id,)
+            )
+            # A write landed while we were loading; our snapshot may predate it.
+            if _versions.get(guild_id, 0) == version:
+                break
+
+        index = GuildRankIndex(players)
+        _indexes[guild_id] = index
+        logging.info(f"Loaded rank index for guild {guild_id} with {len(index)} players.")
+        return index
+
+
+def index_player(guild_id, player_id, elo, discord_user_id=None, player_name=None):
+    """
+    Records a committed rating change or signup. Call it after the write has been committed.
+    """
+    _versions[guild_id] = _versions.get(guild_id, 0) + 1
+    index = _indexes.get(guild_id)
+    if index is not None:
+        index.upsert(player_id, elo, discord_user_id, player_name)
+
+
+def unindex_player(guild_id, player_id):
+    """
+    Records a committed player removal.
+    """
+    _versions[guild_id] = _versions.get(guild_id, 0) + 1
+    index = _indexes.get(guild_id)
+    if index is not None:
+        index.remove(player_id)
+
+
+def invalidate_rank_index(guild_id):
+    """
+    Drops a guild's index so the next lookup reloads it, e.g. after bulk rating changes.
+    """
+    _versions[guild_id] = _versions.get(guild_id, 0) + 1
+    _indexes.pop(guild_id, None)
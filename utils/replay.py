@@ -0,0 +1,456 @@
+# utils/replay.py
+
+import logging
+import time
+import numpy as np
+from utils.db import transaction
+from utils.elo import SENTE_SCORES, calculate_new_ratings
+from utils.rank_index import index_player, invalidate_rank_index
+from utils.player_cache import invalidate_players, invalidate_guild_players
+
+# Calibration solves base_elo by fixed-point iteration. ELO is truncated to an int after every
+# game, so an exact solution does not always exist; a fit within the tolerance is accepted.
+CALIBRATION_ROUNDS = 30
+CALIBRATION_TOLERANCE = 5
+
+
+def replay_ratings(player_ids, base_elos, player1_ids, player2_ids, player1_is_sente, results):
+    """
+    Recomputes ratings and W/L/D counters from a chronological list of games.
+
+    Inputs are columnar: one array per game attribute, in the order the games were played.
+    Counters are computed in a single vectorised pass; ratings have to be applied in
+    order, so they run through `calculate_new_ratings` in a tight loop over plain ints.
+
+    :return: dict of NumPy arrays aligned with `player_ids` (elo, wins, losses, draws,
+             games_played) plus per-game arrays aligned with the games (p1_before, p1_after,
+             p2_before, p2_after, p1_score) for rebuilding the rating ledger.
+    """
+    player_ids = np.asarray(player_ids, dtype=np.int64)
+    n_players = len(player_ids)
+
+    # Map player IDs to dense positions (player_ids is sorted, as fetched ORDER BY player_id)
+    p1 = np.searchsorted(player_ids, np.asarray(player1_ids, dtype=np.int64))
+    p2 = np.searchsorted(player_ids, np.asarray(player2_ids, dtype=np.int64))
+
+    # Player 1's score for every game
+    sente_score = np.array([SENTE_SCORES[result] for result in results], dtype=np.float64)
+    p1_score = np.where(np.asarray(player1_is_sente, dtype=bool), sente_score, 1.0 - sente_score)
+
+    def count(positions, mask):
+        return np.bincount(positions[mask], minlength=n_players)
+
+    p1_won, p1_lost, drawn = p1_score == 1.0, p1_score == 0.0, p1_score == 0.5
+    wins = count(p1, p1_won) + count(p2, p1_lost)
+    losses = count(p1, p1_lost) + count(p2, p1_won)
+    draws = count(p1, drawn) + count(p2, drawn)
+    games_played = np.bincount(p1, minlength=n_players) + np.bincount(p2, minlength=n_players)
+
+    ratings = [int(elo) for elo in base_elos]
+    p1_before, p2_before, p1_after, p2_after = [], [], [], []
+    for a, b, score in zip(p1.tolist(), p2.tolist(), p1_score.tolist()):
+        p1_before.append(ratings[a])
+        p2_before.append(ratings[b])
+        ratings[a], ratings[b] = calculate_new_ratings(ratings[a], ratings[b], score, 1 - score)
+        p1_after.append(ratings[a])
+        p2_after.append(ratings[b])
+
+    return {
+        'elo': np.array(ratings, dtype=np.int64),
+        'wins': wins,
+        'losses': losses,
+        'draws': draws,
+        'games_played': games_played,
+        'p1_before': np.array(p1_before, dtype=np.int64),
+        'p1_after': np.array(p1_after, dtype=np.int64),
+        'p2_before': np.array(p2_before, dtype=np.int64),
+        'p2_after': np.array(p2_after, dtype=np.int64),
+        'p1_score': p1_score,
+    }
+
+
+async def fetch_game_columns(tx, guild_id):
+    """
+    Returns one row of arrays: the guild's games read as columns, in chronological order.
+    """
+    return (await tx.fetch(
+        """
+        SELECT COALESCE(array_agg(game_id ORDER BY date_played, game_id), '{}') AS game_ids,
+               COALESCE(array_agg(player1_id ORDER BY date_played, game_id), '{}') AS player1_ids,
+               COALESCE(array_agg(player2_id ORDER BY date_played, game_id), '{}') AS player2_ids,
+               COALESCE(array_agg(player1_color = 'sente' ORDER BY date_played, game_id), '{}') AS player1_is_sente,
+               COALESCE(array_agg(result ORDER BY date_played, game_id), '{}') AS results
+        FROM games WHERE guild_id = %s
+        """,
+        (guild_id,)
+    ))[0]
+
+
+async def calibrate_guild(tx, guild_id):
+    """
+    Solves `base_elo` for players whose starting rating was never recorded, so that
+    replaying the guild's current games reproduces everyone's current ELO.
+    Must run before the games are changed. Raises ValueError if no base_elo within
+    CALIBRATION_TOLERANCE exists, in which case a full replay would rewrite ratings.
+    """
+    players = await tx.fetch(
+        """
+        SELECT player_id, base_elo, elo, base_elo_calibrated FROM players
+        WHERE guild_id = %s ORDER BY player_id FOR UPDATE
+        """,
+        (guild_id,)
+    )
+    uncalibrated = np.array([not player['base_elo_calibrated'] for player in players], dtype=bool)
+    if not uncalibrated.any():
+        return
+
+    start_time = time.perf_counter()
+    games = await fetch_game_columns(tx, guild_id)
+    player_ids = [player['player_id'] for player in players]
+    target = np.array([player['elo'] for player in players], dtype=np.int64)
+    base_elos = np.array([player['base_elo'] for player in players], dtype=np.int64)
+
+    best_error, best_base_elos = None, base_elos
+    for _ in range(CALIBRATION_ROUNDS):
+        replayed = replay_ratings(
+            player_ids, base_elos, games['player1_ids'], games['player2_ids'],
+            games['player1_is_sente'], games['results'],
+        )
+        residual = target - replayed['elo']
+        error = int(np.abs(residual).max())
+        if best_error is None or error < best_error:
+            best_error, best_base_elos = error, base_elos
+        if error == 0:
+            break
+        # Only the unknown seeds move; calibrated players keep their recorded base_elo
+        base_elos = base_elos + np.where(uncalibrated, residual, 0)
+
+    if best_error > CALIBRATION_TOLERANCE:
+        raise ValueError(
+            f"Ratings in guild {guild_id} cannot be replayed: the starting ELO of players with games "
+            f"from before the rating ledger could not be recovered (off by up to {best_error})."
+        )
+
+    await tx.execute(
+        """
+        UPDATE players p
+        SET base_elo = v.base_elo, base_elo_calibrated = TRUE
+        FROM unnest(%s::int[], %s::int[]) AS v(player_id, base_elo)
+        WHERE p.player_id = v.player_id AND p.guild_id = %s
+        """,
+        (player_ids, best_base_elos.tolist(), guild_id)
+    )
+    logging.info(
+        f"Calibrated base ELO of {int(uncalibrated.sum())} players in guild {guild_id} "
+        f"(max error {best_error}) in {time.perf_counter() - start_time:.2f}s."
+    )
+
+
+async def replay_guild(guild_id, tx=None):
+    """
+    Rebuilds every player's ELO and W/L/D counters in a guild from its games, starting
+    from each player's `base_elo`, and writes them back with one bulk UPDATE.
+    The guild's rating ledger is rebuilt from the same pass.
+
+    All of the guild's player rows are locked (in player_id order) for the duration.
+    When `tx` is given the replay joins that transaction and the caller is responsible
+    for calibrating the guild (`calibrate_guild`) before changing its games and for
+    invalidating the rank index after commit; otherwise it runs in its own.
+    """
+    if tx is None:
+        async with transaction(pipeline=False) as own_tx:
+            await calibrate_guild(own_tx, guild_id)
+            summary = await replay_guild(guild_id, own_tx)
+        invalidate_rank_index(guild_id)
+        invalidate_guild_players(guild_id)
+        return summary
+
+    start_time = time.perf_counter()
+
+    players = await tx.fetch(
+        "SELECT player_id, base_elo FROM players WHERE guild_id = %s ORDER BY player_id FOR UPDATE",
+        (guild_id,)
+    )
+    if not players:
+        return {'players': 0, 'games': 0, 'player_ids': []}
+
+    games = await fetch_game_columns(tx, guild_id)
+
+    player_ids = [player['player_id'] for player in players]
+    replayed = replay_ratings(
+        player_ids,
+        [player['base_elo'] for player in players],
+        games['player1_ids'],
+        games['player2_ids'],
+        games['player1_is_sente'],
+        games['results'],
+    )
+
+    await tx.execute(
+        """
+        UPDATE players p
+        SET elo = v.elo, wins = v.wins, losses = v.losses, draws = v.draws,
+            games_played = v.games_played, last_updated = NOW()
+        FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[], %s::int[], %s::int[])
+            AS v(player_id, elo, wins, losses, draws, games_played)
+        WHERE p.player_id = v.player_id AND p.guild_id = %s
+        """,
+        (
+            player_ids,
+            replayed['elo'].tolist(),
+            replayed['wins'].tolist(),
+            replayed['losses'].tolist(),
+            replayed['draws'].tolist(),
+            replayed['games_played'].tolist(),
+            guild_id,
+        )
+    )
+
+    await rewrite_ledger(tx, guild_id, games, replayed)
+
+    summary = {'players': len(player_ids), 'games': len(games['results']), 'player_ids': player_ids}
+    logging.info(
+        f"Replayed {summary['games']} games for {summary['players']} players in guild {guild_id} "
+        f"in {time.perf_counter() - start_time:.2f}s."
+    )
+    return summary
+
+
+async def rewrite_ledger(tx, guild_id, games, replayed):
+    """
+    Replaces a guild's rating ledger with the per-game ratings produced by `replay_ratings`.
+    """
+    p1_score = replayed['p1_score']
+    game_ids = games['game_ids'] * 2
+    player_ids = games['player1_ids'] + games['player2_ids']
+    elo_before = replayed['p1_before'].tolist() + replayed['p2_before'].tolist()
+    elo_after = replayed['p1_after'].tolist() + replayed['p2_after'].tolist()
+    wins = np.concatenate([p1_score == 1.0, p1_score == 0.0]).astype(int).tolist()
+    losses = np.concatenate([p1_score == 0.0, p1_score == 1.0]).astype(int).tolist()
+    draws = np.concatenate([p1_score == 0.5, p1_score == 0.5]).astype(int).tolist()
+
+    await tx.execute("DELETE FROM rating_ledger WHERE guild_id = %s", (guild_id,))
+    await tx.execute(
+        """
+        INSERT INTO rating_ledger
+            (game_id, guild_id, player_id, elo_before, elo_after, wins_delta, losses_delta, draws_delta)
+        SELECT v.game_id, %s, v.player_id, v.elo_before, v.elo_after, v.wins_delta, v.losses_delta, v.draws_delta
+        FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[], %s::int[], %s::int[], %s::int[])
+            AS v(game_id, player_id, elo_before, elo_after, wins_delta, losses_delta, draws_delta)
+        """,
+        (guild_id, game_ids, player_ids, elo_before, elo_after, wins, losses, draws)
+    )
+
+
+class _LockOrderRetry(Exception):
+    """Raised to roll back a revert that would have to take locks out of player_id order."""
+
+
+async def revert_game(guild_id, game_id):
+    """
+    Deletes a game and reverts the rating and counter changes it caused.
+
+    - If neither player has played since, their ledger deltas are subtracted directly (O(1)).
+    - Otherwise only the games after it are replayed: each affected player carries an ELO
+      offset forward through their later games, so manual adjustments in between are kept.
+    - Games recorded before the ledger existed fall back to a full guild replay, after
+      calibrating any unknown starting ratings; ValueError is raised if that is not possible.
+
+    :return: (mode, player_ids): mode is 'reverted', 'partial' or 'full', describing which
+             path was taken, and player_ids are the players whose ELO may have changed.
+    """
+    while True:
+        try:
+            async with transaction(pipeline=False) as tx:
+                mode, pair, changed = await _revert_game(tx, guild_id, game_id)
+            break
+        except _LockOrderRetry:
+            logging.info(f"Game {game_id} gained a later game while being removed; retrying with a replay.")
+
+    if mode == 'full':
+        invalidate_rank_index(guild_id)
+        invalidate_guild_players(guild_id)
+        player_ids = changed['player_ids']
+    else:
+        for player in changed:
+            index_player(guild_id, player['player_id'], player['elo'])
+        player_ids = [player['player_id'] for player in changed]
+        # Both players' counters changed even if a later game left their ELO unchanged
+        invalidate_players(guild_id, {*player_ids, *pair})
+
+    logging.info(f"Removed game {game_id} from guild {guild_id} ({mode}).")
+    return mode, player_ids
+
+
+async def _revert_game(tx, guild_id, game_id):
+    """
+    The body of `revert_game`, inside its transaction. Returns (mode, pair, changed): the
+    replay summary for 'full', otherwise the affected players' new ELO.
+    Raises _LockOrderRetry if the pair was locked before a later game for it appeared.
+    """
+    game = await tx.fetch(
+        "SELECT game_id, date_played, player1_id, player2_id FROM games WHERE game_id = %s AND guild_id = %s",
+        (game_id, guild_id)
+    )
+    if not game:
+        raise ValueError(f"Game {game_id} does not exist in guild {guild_id}")
+    game = game[0]
+    pair = sorted((game['player1_id'], game['player2_id']))
+
+    ledger = await tx.fetch(
+        """
+        SELECT player_id, elo_before, elo_after, wins_delta, losses_delta, draws_delta
+        FROM rating_ledger WHERE game_id = %s
+        """,
+        (game_id,)
+    )
+    if len(ledger) != 2:
+        await calibrate_guild(tx, guild_id)
+        await tx.execute("DELETE FROM games WHERE game_id = %s", (game_id,))
+        replayed = await replay_guild(guild_id, tx)
+        mode = 'full'
+    else:
+        later_games_sql = """
+            SELECT EXISTS (
+                SELECT 1 FROM games
+                WHERE guild_id = %s AND (date_played, game_id) > (%s, %s)
+                  AND (player1_id = ANY(%s) OR player2_id = ANY(%s))
+            ) AS has_later_games
+        """
+        later_games_params = (guild_id, game['date_played'], game_id, pair, pair)
+        mode = 'partial'
+        if not (await tx.fetch(later_games_sql, later_games_params))[0]['has_later_games']:
+            # Lock the pair, then make sure no game for them committed in the meantime
+            await tx.fetch(
+                "SELECT player_id FROM players WHERE player_id = ANY(%s) ORDER BY player_id FOR UPDATE",
+                (pair,)
+            )
+            if (await tx.fetch(later_games_sql, later_games_params))[0]['has_later_games']:
+                # Replaying needs the whole guild locked in player_id order; locking it
+                # while holding the pair could deadlock, so start over without the pair
+                raise _LockOrderRetry()
+            mode = 'reverted'
+
+        if mode == 'reverted':
+            updated = await revert_ledger_entries(tx, ledger)
+        else:
+            updated = await replay_after(tx, guild_id, game, ledger)
+            if updated is None:
+                await calibrate_guild(tx, guild_id)
+                await tx.execute("DELETE FROM games WHERE game_id = %s", (game_id,))
+                replayed = await replay_guild(guild_id, tx)
+                mode = 'full'
+
+        if mode != 'full':
+            await tx.execute("DELETE FROM games WHERE game_id = %s", (game_id,))
+    return mode, pair, replayed if mode == 'full' else updated
+
+
+async def revert_ledger_entries(tx, ledger):
+    """
+    Subtracts one game's ledger deltas from its two players. Returns their new ELO.
+    """
+    updated = []
+    for entry in ledger:
+        updated += await tx.fetch(
+            """
+            UPDATE players
+            SET elo = elo - %s, wins = wins - %s, losses = losses - %s, draws = draws - %s,
+                games_played = games_played - 1, last_updated = NOW()
+            WHERE player_id = %s
+            RETURNING player_id, elo
+            """,
+            (
+                entry['elo_after'] - entry['elo_before'],
+                entry['wins_delta'], entry['losses_delta'], entry['draws_delta'],
+                entry['player_id'],
+            )
+        )
+    return updated
+
+
+async def replay_after(tx, guild_id, game, ledger):
+    """
+    Replays only the games played after `game` as if it had never happened, using the
+    ledger for everyone's ratings going into each game. Updates the ledger rows and the
+    affected players' ELO, and reverts the removed game's counters.
+
+    :return: the affected players' new ELO, or None if a later game has no ledger rows.
+    """
+    # Lock the whole guild in player_id order, the same order a full replay uses
+    await tx.fetch(
+        "SELECT player_id FROM players WHERE guild_id = %s ORDER BY player_id FOR UPDATE",
+        (guild_id,)
+    )
+    later_games = await tx.fetch(
+        """
+        SELECT g.game_id, g.player1_id, g.player2_id, g.player1_color, g.result,
+               l1.elo_before AS p1_before, l1.elo_after AS p1_after,
+               l2.elo_before AS p2_before, l2.elo_after AS p2_after
+        FROM games g
+        LEFT JOIN rating_ledger l1 ON l1.game_id = g.game_id AND l1.player_id = g.player1_id
+        LEFT JOIN rating_ledger l2 ON l2.game_id = g.game_id AND l2.player_id = g.player2_id
+        WHERE g.guild_id = %s AND (g.date_played, g.game_id) > (%s, %s)
+        ORDER BY g.date_played, g.game_id
+        """,
+        (guild_id, game['date_played'], game['game_id'])
+    )
+    if any(later['p1_before'] is None or later['p2_before'] is None for later in later_games):
+        return None
+
+    # How far each affected player's rating now differs from what the ledger recorded
+    offsets = {entry['player_id']: entry['elo_before'] - entry['elo_after'] for entry in ledger}
+    ledger_game_ids, ledger_player_ids, ledger_before, ledger_after = [], [], [], []
+
+    for later in later_games:
+        a, b = later['player1_id'], later['player2_id']
+        offset_a, offset_b = offsets.get(a, 0), offsets.get(b, 0)
+        if not offset_a and not offset_b:
+            continue
+
+        score = SENTE_SCORES[later['result']]
+        if later['player1_color'] != 'sente':
+            score = 1 - score
+        before_a, before_b = later['p1_before'] + offset_a, later['p2_before'] + offset_b
+        after_a, after_b = calculate_new_ratings(before_a, before_b, score, 1 - score)
+        offsets[a], offsets[b] = after_a - later['p1_after'], after_b - later['p2_after']
+
+        ledger_game_ids += [later['game_id'], later['game_id']]
+        ledger_player_ids += [a, b]
+        ledger_before += [before_a, before_b]
+        ledger_after += [after_a, after_b]
+
+    if ledger_game_ids:
+        await tx.execute(
+            """
+            UPDATE rating_ledger l
+            SET elo_before = v.elo_before, elo_after = v.elo_after
+            FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[]) AS v(game_id, player_id, elo_before, elo_after)
+            WHERE l.game_id = v.game_id AND l.player_id = v.player_id
+            """,
+            (ledger_game_ids, ledger_player_ids, ledger_before, ledger_after)
+        )
+
+    for entry in ledger:
+        await tx.execute(
+            """
+            UPDATE players
+            SET wins = wins - %s, losses = losses - %s, draws = draws - %s, games_played = games_played - 1
+            WHERE player_id = %s
+            """,
+            (entry['wins_delta'], entry['losses_delta'], entry['draws_delta'], entry['player_id'])
+        )
+
+    changed = {player_id: offset for player_id, offset in offsets.items() if offset}
+    if not changed:
+        return []
+    return await tx.fetch(
+        """
+        UPDATE players p
+        SET elo = p.elo + v.offset_elo, last_updated = NOW()
+        FROM unnest(%s::int[], %s::int[]) AS v(player_id, offset_elo)
+        WHERE p.player_id = v.player_id
+        RETURNING p.player_id, p.elo
+        """,
+        (list(changed), list(changed.values()))
+    )
@@ -0,0 +1,180 @@
+# utils/role_config.py
+
+import asyncio
+import bisect
+import logging
+import discord
+from utils.db import transaction
+
+# Roles seeded for a guild that has none configured yet (migration 006 seeds existing guilds)
+DEFAULT_TOP_RANK_ROLES = [
+    ('Rank 1', 1, discord.Color.gold()),
+    ('Rank 2', 2, discord.Color.from_rgb(192, 192, 192)),  # Silver color
+    ('Rank 3', 3, discord.Color.from_rgb(205, 127, 50)),   # Bronze color
+    ('Top 10', 10, discord.Color.blue()),                  # Light blue color
+]
+DEFAULT_ELO_BENCHMARKS = range(100, 4000, 100)  # "100" ... "3900"
+
+
+class GuildRoleConfig:
+    """
+    A guild's ranking roles as configured in the `roles` table, plus the roles the bot
+    last assigned to each player according to `player_roles`.
+    """
+
+    def __init__(self, roles, assigned=()):
+        # A role without a threshold cannot be placed in either ladder, so it is ignored
+        for role in roles:
+            if role['threshold'] is None:
+                logging.warning(f"Ignoring role `{role['role_name']}` (ID: {role['role_id']}) without a threshold.")
+        roles = [role for role in roles if role['threshold'] is not None]
+        self.roles = {role['role_id']: role for role in roles}
+        self.role_names = {role['role_name'] for role in roles}
+
+        top_ranks = sorted((role for role in roles if role['role_type'] == 'top_rank'), key=lambda role: role['threshold'])
+        self.top_rank_thresholds = [role['threshold'] for role in top_ranks]
+        self.top_rank_roles = top_ranks
+
+        benchmarks = sorted((role for role in roles if role['role_type'] == 'elo_benchmark'), key=lambda role: role['threshold'])
+        self.benchmark_thresholds = [role['threshold'] for role in benchmarks]
+        self.benchmark_roles = benchmarks
+
+        self.assigned = {row['player_id']: frozenset(row['role_ids']) for row in assigned}
+
+    @property
+    def depth(self):
+        """Deepest rank that earns a top_rank role (0 if the guild has none)."""
+        return self.top_rank_thresholds[-1] if self.top_rank_thresholds else 0
+
+    def ranking_role_for(self, rank):
+        """Returns the top_rank role for a rank, or None if the rank earns none."""
+        if rank is None:
+            return None
+        position = bisect.bisect_left(self.top_rank_thresholds, rank)
+        return self.top_rank_roles[position] if position < len(self.top_rank_roles) else None
+
+    def elo_role_for(self, elo):
+        """Returns the elo_benchmark role for a rating, or None if it is below every threshold."""
+        if elo is None:
+            return None
+        position = bisect.bisect_right(self.benchmark_thresholds, elo) - 1
+        return self.benchmark_roles[position] if position >= 0 else None
+
+    def nearby_elo_roles(self, elo):
+        """Returns the elo_benchmark role for a rating and its neighbouring benchmarks."""
+        position = bisect.bisect_right(self.benchmark_thresholds, elo) - 1
+        return self.benchmark_roles[max(position - 1, 0):max(position + 2, 0)]
+
+    def desired_roles(self, elo, rank):
+        """Returns the configured roles a player with this rating and rank should hold."""
+        return [role for role in (self.ranking_role_for(rank), self.elo_role_for(elo)) if role]
+
+
+_configs = {}  # guild_id -> GuildRoleConfig
+_locks = {}  # guild_id -> asyncio.Lock guarding the initial load
+
+
+async def seed_default_roles(guild_id, tx):
+    """
+    Inserts the default ranking roles for a guild, keeping any that already exist.
+    """
+    await tx.execute(
+        """
+        INSERT INTO roles (guild_id, role_name, role_type, threshold, color)
+        SELECT %s, d.role_name, 'top_rank', d.threshold, d.color
+        FROM unnest(%s::text[], %s::int[], %s::int[]) AS d(role_name, threshold, color)
+        UNION ALL
+        SELECT %s, t::text, 'elo_benchmark', t, NULL
+        FROM unnest(%s::int[]) AS t
+        ON CONFLICT (guild_id, role_name) DO NOTHING
+        """,
+        (
+            guild_id,
+            [name for name, _, _ in DEFAULT_TOP_RANK_ROLES],
+            [threshold for _, threshold, _ in DEFAULT_TOP_RANK_ROLES],
+            [color.value for _, _, color in DEFAULT_TOP_RANK_ROLES],
+            guild_id,
+            list(DEFAULT_ELO_BENCHMARKS),
+        )
+    )
+
+
+async def get_role_config(guild_id):
+    """
+    Returns the role configuration for a guild, loading it from the database on first use.
+    Guilds without any configured roles are seeded with the defaults.
+    """
+    config = _configs.get(guild_id)
+    if config is not None:
+        return config
+
+    lock = _locks.setdefault(guild_id, asyncio.Lock())
+    async with lock:
+        config = _configs.get(guild_id)
+        if config is not None:
+            return config
+
+        async with transaction() as tx:
+            roles_query = """
+                SELECT role_id, role_name, role_type, threshold, color
+                FROM roles WHERE guild_id = %s
+            """
+            roles = await tx.fetch(roles_query, (guild_id,))
+            if not roles:
+                await seed_default_roles(guild_id, tx)
+                roles = await tx.fetch(roles_query, (guild_id,))
+
+            assigned = await tx.fetch(
+                """
+                SELECT pr.player_id, array_agg(pr.role_id) AS role_ids
+                FROM player_roles pr
+                JOIN roles r ON r.role_id = pr.role_id
+                WHERE r.guild_id = %s
+                GROUP BY pr.player_id
+                """,
+                (guild_id,)
+            )
+
+        config = GuildRoleConfig(roles, assigned)
+        _configs[guild_id] = config
+        logging.info(
+            f"Loaded role config for guild {guild_id}: {len(config.roles)} roles, "
+            f"{len(config.assigned)} players with recorded roles."
+        )
+        return config
+
+
+async def record_player_roles(guild_id, player_id, role_ids):
+    """
+    Records the configured roles a player now holds, in `player_roles` and in the cached config.
+    """
+    role_ids = frozenset(role_ids)
+    async with transaction() as tx:
+        await tx.execute(
+            "DELETE FROM player_roles WHERE player_id = %s AND NOT (role_id = ANY(%s::int[]))",
+            (player_id, list(role_ids))
+        )
+        if role_ids:
+            await tx.execute(
+                """
+                INSERT INTO player_roles (player_id, role_id)
+                SELECT %s, role_id FROM unnest(%s::int[]) AS role_id
+                ON CONFLICT (player_id, role_id) DO NOTHING
+                """,
+                (player_id, list(role_ids))
+            )
+
+    config = _configs.get(guild_id)
+    if config is not None:
+        if role_ids:
+            config.assigned[player_id] = role_ids
+        else:
+            config.assigned.pop(player_id, None)
+
+
+def invalidate_role_config(guild_id):
+    """
+    Drops a guild's role config so it is reloaded on next use, e.g. after editing the roles table.
+    Called by `!reloadroles` and at the start of every role sweep.
+    """
+    _configs.pop(guild_id, None)
@@ -0,0 +1,189 @@
+# utils/role_queue.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+import discord
+from utils.rank_index import get_rank_index
+from utils.role_config import get_role_config, invalidate_role_config
+from utils.role_update import reconcile_player_roles, ranked_role_snapshot, changed_ranked_roles
+
+
+# Role edits share Discord's per-guild member route bucket, so each guild gets a small
+# number of workers, and all guilds together are capped by a global budget
+GLOBAL_ROLE_UPDATE_CONCURRENCY = 16
+GUILD_ROLE_UPDATE_CONCURRENCY = 2
+SWEEP_PROGRESS_INTERVAL = 30  # seconds
+
+
+class RoleUpdateQueue:
+    """
+    Coalescing scheduler for role updates. Each guild has its own queue drained by up to
+    GUILD_ROLE_UPDATE_CONCURRENCY workers, and at most GLOBAL_ROLE_UPDATE_CONCURRENCY
+    updates run at once across all guilds. A player queued several times before a worker
+    reaches them is updated once, using their rating and rank at that moment.
+
+    Queued updates are decided from the roles recorded in `player_roles`; updates queued
+    with `verify` (the periodic sweep) compare against the member's live roles instead.
+    """
+
+    def __init__(self, global_concurrency=GLOBAL_ROLE_UPDATE_CONCURRENCY,
+                 guild_concurrency=GUILD_ROLE_UPDATE_CONCURRENCY):
+        self.global_concurrency = global_concurrency
+        self.guild_concurrency = guild_concurrency
+        self.pending = {}        # (guild_id, player_id) -> (guild, verify)
+        self.guild_queues = {}   # guild_id -> deque of player_ids
+        self.guild_workers = {}  # guild_id -> set of worker tasks
+        self.processed = 0
+        self.changed = 0
+        self.failed = 0
+        self._semaphore = None
+        self._idle = None
+
+    def enqueue(self, guild: discord.Guild, player_ids, verify=False):
+        """
+        Queues role updates for the given players. Must be called from the event loop.
+        Returns the number of players that were not already queued.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.global_concurrency)
+            self._idle = asyncio.Event()
+            self._idle.set()
+
+        queue = self.guild_queues.setdefault(guild.id, deque())
+        added = 0
+        for player_id in player_ids:
+            key = (guild.id, player_id)
+            if key not in self.pending:
+                self.pending[key] = (guild, verify)
+                queue.append(player_id)
+                added += 1
+            elif verify:
+                self.pending[key] = (guild, True)
+
+        workers = self.guild_workers.get(guild.id, set())
+        # A worker that just drained the queue may not have run its done callback yet
+        workers.difference_update([task for task in workers if task.done()])
+        while queue and len(workers) < min(self.guild_concurrency, len(queue)):
+            task = asyncio.create_task(self._run(guild.id))
+            workers.add(task)
+            task.add_done_callback(lambda task, guild_id=guild.id: self._worker_done(guild_id, task))
+
+        # Only guilds with live workers are tracked, or wait_idle() would never return
+        if workers:
+            self.guild_workers[guild.id] = workers
+            self._idle.clear()
+        else:
+            self.guild_workers.pop(guild.id, None)
+            if not queue:
+                self.guild_queues.pop(guild.id, None)
+            if not self.guild_workers:
+                self._idle.set()
+        return added
+
+    def _worker_done(self, guild_id, task):
+        workers = self.guild_workers.get(guild_id)
+        if workers is not None:
+            workers.discard(task)
+            if not workers:
+                del self.guild_workers[guild_id]
+                if not self.guild_queues.get(guild_id):
+                    self.guild_queues.pop(guild_id, None)
+        if not self.guild_workers:
+            self._idle.set()
+
+    async def _run(self, guild_id):
+        queue = self.guild_queues[guild_id]
+        while queue:
+            player_id = queue.popleft()
+            entry = self.pending.pop((guild_id, player_id), None)
+            if entry is None:
+                continue
+            guild, verify = entry
+            async with self._semaphore:
+                try:
+                    if await self._apply(guild, player_id, verify):
+                        self.changed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logging.error(f"Failed to update roles for player {player_id} in guild {guild.name}: {e}")
+            self.processed += 1
+
+    async def _apply(self, guild, player_id, verify):
+        rank_index = await get_rank_index(guild.id)
+        player = rank_index.get(player_id)
+        if not player:
+            return False
+        return await reconcile_player_roles(
+            guild, player_id, player['discord_user_id'], player['elo'], rank_index.rank(player_id), verify
+        )
+
+    async def wait_idle(self):
+        """
+        Waits until every queued update has been applied.
+        """
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def sweep(self, guilds):
+        """
+        Queues a role update for every ranked player in the given guilds and waits for all
+        of them to finish, logging progress every SWEEP_PROGRESS_INTERVAL seconds.
+        Sweep updates check live member roles, so roles edited by hand are repaired, and
+        each guild's role config is reloaded first, so edits to the `roles` table apply.
+        """
+        start_time = time.perf_counter()
+        processed_before, changed_before, failed_before = self.processed, self.changed, self.failed
+
+        queued = 0
+        for guild in guilds:
+            invalidate_role_config(guild.id)
+            rank_index = await get_rank_index(guild.id)
+            queued += self.enqueue(guild, list(rank_index.players), verify=True)
+        logging.info(f"Role sweep queued {queued} players across {len(guilds)} guilds.")
+
+        while True:
+            try:
+                await asyncio.wait_for(self.wait_idle(), timeout=SWEEP_PROGRESS_INTERVAL)
+                break
+            except asyncio.TimeoutError:
+                logging.info(
+                    f"Role sweep progress: {self.processed - processed_before} processed, "
+                    f"{len(self.pending)} pending, {len(self.guild_workers)} guilds active."
+                )
+
+        summary = {
+            'queued': queued,
+            'processed': self.processed - processed_before,
+            'changed': self.changed - changed_before,
+            'failed': self.failed - failed_before,
+        }
+        logging.info(
+            f"Role sweep finished in {time.perf_counter() - start_time:.1f}s: "
+            f"{summary['changed']} of {summary['processed']} members needed changes, {summary['failed']} failed."
+        )
+        return summary
+
+
+role_update_queue = RoleUpdateQueue()
+
+
+async def snapshot_ranked_roles(guild_id):
+    """
+    Takes a ranking role snapshot of a guild. Call it before a rating change and pass the
+    result to `queue_rank_changes` afterwards.
+    """
+    return ranked_role_snapshot(await get_rank_index(guild_id), await get_role_config(guild_id))
+
+
+async def queue_rank_changes(guild: discord.Guild, before, player_ids=()):
+    """
+    Queues role updates for everyone whose ranking role moved since the `before` snapshot,
+    plus the given players (whose own rating, and so ELO role, changed).
+    """
+    after = ranked_role_snapshot(await get_rank_index(guild.id), await get_role_config(guild.id))
+    affected = changed_ranked_roles(before, after) | set(player_ids)
+    if affected:
+        role_update_queue.enqueue(guild, affected)
+    return affected
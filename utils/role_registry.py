@@ -0,0 +1,74 @@
+# utils/role_registry.py
+
+import asyncio
+import logging
+import discord
+
+
+class GuildRoleRegistry:
+    """
+    Name -> Role map for one guild, built once from the gateway cache.
+    Lookups are O(1); missing roles are created at most once per name.
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild = guild
+        self.roles = {}
+        for role in guild.roles:
+            # Keep the first role for duplicated names, matching discord.utils.get
+            self.roles.setdefault(role.name, role)
+        self._creation_locks = {}
+
+    def get(self, role_name):
+        """Returns the role with this name, or None."""
+        return self.roles.get(role_name)
+
+    async def ensure(self, role_name, color=None):
+        """
+        Returns the role with this name, creating it if it does not exist yet.
+        Returns None if the role could not be created.
+        """
+        role = self.roles.get(role_name)
+        if role:
+            return role
+
+        lock = self._creation_locks.setdefault(role_name, asyncio.Lock())
+        async with lock:
+            role = self.roles.get(role_name)
+            if role:
+                return role
+            try:
+                if color is not None:
+                    role = await self.guild.create_role(name=role_name, color=color)
+                else:
+                    role = await self.guild.create_role(name=role_name)
+                logging.info(f"Created role {role_name} in guild {self.guild.name} (ID: {self.guild.id})")
+            except discord.Forbidden:
+                print(f"⚠️ [Error] Insufficient permissions to create role {role_name}.")
+                return None
+            except Exception as e:
+                print(f"⚠️ [Error] Unexpected error while creating role {role_name}: {e}")
+                return None
+            self.roles[role_name] = role
+            return role
+
+
+_registries = {}  # guild_id -> GuildRoleRegistry
+
+
+def get_role_registry(guild: discord.Guild):
+    """
+    Returns the role registry for a guild, building it from the cached guild roles on first use.
+    """
+    registry = _registries.get(guild.id)
+    if registry is None:
+        registry = GuildRoleRegistry(guild)
+        _registries[guild.id] = registry
+    return registry
+
+
+def invalidate_role_registry(guild_id):
+    """
+    Drops a guild's registry so it is rebuilt on next use. Called from the on_guild_role_* events.
+    """
+    _registries.pop(guild_id, None)
@@ -1,99 +1,122 @@
 import discord
-import re
-from utils.db import fetch_query, execute_query
-
-# Define ranking roles with their colors
-RANKING_ROLES = {
-    1: {'role_name': 'Rank 1', 'color': discord.Color.gold()},
-    2: {'role_name': 'Rank 2', 'color': discord.Color.from_rgb(192, 192, 192)},  # Silver color
-    3: {'role_name': 'Rank 3', 'color': discord.Color.from_rgb(205, 127, 50)},   # Bronze color
-    'top_10': {'role_name': 'Top 10', 'color': discord.Color.blue()}             # Light blue color
-}
-
-async def update_player_roles(member: discord.Member, elo: int, rank: int):
+from utils.role_registry import get_role_registry
+from utils.role_config import get_role_config, record_player_roles
+
+
+def ranked_role_snapshot(rank_index, config):
+    """
+    Returns {player_id: top_rank role name} for everyone ranked up to one place below the
+    guild's deepest top_rank threshold. Players further down hold no ranking role, so
+    comparing two snapshots taken around a rating change finds everyone whose ranking role moved.
+    """
+    snapshot = {}
+    for rank, player_id, _ in rank_index.range(1, config.depth + 1):
+        role = config.ranking_role_for(rank)
+        snapshot[player_id] = role['role_name'] if role else None
+    return snapshot
+
+
+def changed_ranked_roles(before, after):
+    """
+    Returns the player IDs whose ranking role differs between two snapshots.
+    A player missing from a snapshot is ranked too low to hold a ranking role.
+    """
+    return {
+        player_id for player_id in before.keys() | after.keys()
+        if before.get(player_id) != after.get(player_id)
+    }
+
+
+def role_color(role):
+    """Returns the discord.Color configured for a role row, or None."""
+    return discord.Color(role['color']) if role['color'] is not None else None
+
+
+async def prewarm_roles(guild: discord.Guild, elos=()):
+    """
+    Creates any missing ranking roles, plus the ELO benchmark roles for the given ratings
+    and their neighbouring benchmarks, so role updates never have to create roles.
+    """
+    registry = get_role_registry(guild)
+    config = await get_role_config(guild.id)
+    for role in config.top_rank_roles:
+        await registry.ensure(role['role_name'], role_color(role))
+
+    benchmarks = {}
+    for elo in elos:
+        for role in config.nearby_elo_roles(elo):
+            benchmarks[role['role_id']] = role
+    for role in sorted(benchmarks.values(), key=lambda role: role['threshold']):
+        await registry.ensure(role['role_name'], role_color(role))
+
+
+async def update_player_roles(member: discord.Member, elo, rank, player_id=None):
     """
     Update the player's roles based on their ELO rating and rank.
 
+    The desired role set is computed from the guild's `roles` table and compared with the
+    member's current roles; only if they differ is a single `member.edit(roles=...)` call made.
+
     Parameters:
     - member: The Discord member whose roles need to be updated.
-    - elo: The player's current ELO rating.
-    - rank: The player's current rank (1-based).
+    - elo: The player's current ELO rating, or None to remove their ELO role.
+    - rank: The player's current rank (1-based), or None to remove their ranking role.
+    - player_id: If given, the resulting roles are recorded in `player_roles`.
+
+    Returns True if the member's roles were changed.
     """
-    guild = member.guild
+    registry = get_role_registry(member.guild)
+    config = await get_role_config(member.guild.id)
+    desired = config.desired_roles(elo, rank)
 
-    # Remove existing ranking roles from the member
-    ranking_role_names = [role_info['role_name'] for role_info in RANKING_ROLES.values()]
-    roles_to_remove = [
-        discord.utils.get(guild.roles, name=role_name)
-        for role_name in ranking_role_names
-    ]
-    roles_to_remove = [role for role in roles_to_remove if role and role in member.roles]
+    # Roles are normally prewarmed at startup, so `ensure` is a dictionary lookup here
+    desired_roles = []
+    for role in desired:
+        discord_role = await registry.ensure(role['role_name'], role_color(role))
+        if discord_role:
+            desired_roles.append(discord_role)
 
-    if roles_to_remove:
-        try:
-            await member.remove_roles(*roles_to_remove)
-        except discord.Forbidden:
-            print(f"⚠️ [Error] Insufficient permissions to remove ranking roles for {member.display_name}.")
-        except Exception as e:
-            print(f"⚠️ [Error] Unexpected error while removing ranking roles for {member.display_name}: {e}")
-
-    # Assign new ranking role if applicable
-    role_info = None
-    if rank == 1:
-        role_info = RANKING_ROLES[1]
-    elif rank == 2:
-        role_info = RANKING_ROLES[2]
-    elif rank == 3:
-        role_info = RANKING_ROLES[3]
-    elif 4 <= rank <= 10:
-        role_info = RANKING_ROLES['top_10']
-
-    if role_info:
-        new_ranking_role = discord.utils.get(guild.roles, name=role_info['role_name'])
-        if not new_ranking_role:
-            try:
-                new_ranking_role = await guild.create_role(name=role_info['role_name'], color=role_info['color'])
-            except discord.Forbidden:
-                print(f"⚠️ [Error] Insufficient permissions to create ranking role {role_info['role_name']}.")
-            except Exception as e:
-                print(f"⚠️ [Error] Unexpected error while creating ranking role {role_info['role_name']}: {e}")
-                new_ranking_role = None
-
-        if new_ranking_role:
-            try:
-                await member.add_roles(new_ranking_role)
-            except discord.Forbidden:
-                print(f"⚠️ [Error] Insufficient permissions to assign ranking role {new_ranking_role.name} to {member.display_name}.")
-            except Exception as e:
-                print(f"⚠️ [Error] Unexpected error while assigning ranking role {new_ranking_role.name} to {member.display_name}: {e}")
-
-    # Remove existing ELO roles
-    elo_role_pattern = re.compile(r'^\d{3,4}$')  # Matches ELO roles like "1200", "1500"
-    existing_elo_roles = [role for role in member.roles if elo_role_pattern.match(role.name)]
-    if existing_elo_roles:
-        try:
-            await member.remove_roles(*existing_elo_roles)
-        except discord.Forbidden:
-            print(f"⚠️ [Error] Insufficient permissions to remove ELO roles for {member.display_name}.")
-        except Exception as e:
-            print(f"⚠️ [Error] Unexpected error while removing ELO roles for {member.display_name}: {e}")
+    # Keep every role the ranking system does not own, then add the desired ones
+    current_roles = [role for role in member.roles if not role.is_default()]
+    new_roles = [role for role in current_roles if role.name not in config.role_names] + desired_roles
 
-    # Assign new ELO role
-    elo_role_name = f"{(elo // 100) * 100}"  # Group ELO into ranges (e.g., 1200-1299 => 1200)
-    new_elo_role = discord.utils.get(guild.roles, name=elo_role_name)
-    if not new_elo_role:
+    changed = False
+    if set(new_roles) != set(current_roles):
         try:
-            new_elo_role = await guild.create_role(name=elo_role_name)
+            await member.edit(roles=new_roles)
+            changed = True
         except discord.Forbidden:
-            print(f"⚠️ [Error] Insufficient permissions to create ELO role {elo_role_name}.")
+            print(f"⚠️ [Error] Insufficient permissions to update ranking roles for {member.display_name}.")
+            return False
         except Exception as e:
-            print(f"⚠️ [Error] Unexpected error while creating ELO role {elo_role_name}: {e}")
-            new_elo_role = None
+            print(f"⚠️ [Error] Unexpected error while updating ranking roles for {member.display_name}: {e}")
+            return False
 
-    if new_elo_role:
-        try:
-            await member.add_roles(new_elo_role)
-        except discord.Forbidden:
-            print(f"⚠️ [Error] Insufficient permissions to assign ELO role {new_elo_role.name} to {member.display_name}.")
-        except Exception as e:
-            print(f"⚠️ [Error] Unexpected error while assigning ELO role {new_elo_role.name} to {member.display_name}: {e}")
+    if player_id is not None:
+        role_ids = frozenset(role['role_id'] for role in desired)
+        if config.assigned.get(player_id, frozenset()) != role_ids:
+            await record_player_roles(member.guild.id, player_id, role_ids)
+    return changed
+
+
+async def reconcile_player_roles(guild: discord.Guild, player_id, discord_user_id, elo, rank, verify=False):
+    """
+    Brings a player's roles in line with their rating and rank.
+
+    Unless `verify` is set, the decision is made from the roles recorded in `player_roles`:
+    a player whose recorded roles already match is skipped without looking at the member.
+    With `verify`, the member's live roles are always compared, which repairs roles that
+    were changed by hand.
+
+    Returns True if the member's roles were changed.
+    """
+    if not verify:
+        config = await get_role_config(guild.id)
+        desired = frozenset(role['role_id'] for role in config.desired_roles(elo, rank))
+        if config.assigned.get(player_id, frozenset()) == desired:
+            return False
+
+    member = guild.get_member(discord_user_id)
+    if not member:
+        return False
+    return await update_player_roles(member, elo, rank, player_id)
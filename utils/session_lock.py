@@ -0,0 +1,102 @@
+# utils/session_lock.py
+
+import os
+import time
+import uuid
+from utils.db import async_execute_query, async_fetch_query
+from utils.sharding import WORKER_PROCESSES
+
+# How long a session lock lives without being refreshed. Running commands refresh their
+# lock every SESSION_LOCK_TTL / 3 seconds, so this only bounds how long a lock leaked by
+# a crash or a skipped cleanup can block a user.
+SESSION_LOCK_TTL = int(os.getenv("SESSION_LOCK_TTL", "300"))
+
+
+class InProcessSessionLock:
+    """
+    Session locks held in this process's memory. Only correct when a single process serves
+    every guild the user is in, which per-guild scoping guarantees for sharded deployments too.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # (guild_id, user_id) -> (token, expires_at)
+
+    async def acquire(self, guild_id, user_id, command_name=None, ttl=SESSION_LOCK_TTL):
+        """Returns a token if the lock was acquired, or None if a live session holds it."""
+        key = (guild_id, user_id)
+        now = time.monotonic()
+        session = self.sessions.get(key)
+        if session and session[1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self.sessions[key] = (token, now + ttl)
+        return token
+
+    async def refresh(self, guild_id, user_id, token, ttl=SESSION_LOCK_TTL):
+        """Extends a held lock. Returns False if the lock was lost."""
+        key = (guild_id, user_id)
+        session = self.sessions.get(key)
+        if not session or session[0] != token:
+            return False
+        self.sessions[key] = (token, time.monotonic() + ttl)
+        return True
+
+    async def release(self, guild_id, user_id, token):
+        """Releases a lock if it is still held with this token."""
+        key = (guild_id, user_id)
+        session = self.sessions.get(key)
+        if session and session[0] == token:
+            del self.sessions[key]
+
+
+class PostgresSessionLock:
+    """
+    Session locks stored in the `command_sessions` table, shared by every bot process.
+    An expired row is taken over atomically by the next acquire.
+    """
+
+    async def acquire(self, guild_id, user_id, command_name=None, ttl=SESSION_LOCK_TTL):
+        """Returns a token if the lock was acquired, or None if a live session holds it."""
+        token = uuid.uuid4().hex
+        rows = await async_fetch_query(
+            """
+            INSERT INTO command_sessions (guild_id, user_id, token, command_name, expires_at)
+            VALUES (%s, %s, %s, %s, NOW()::timestamp + make_interval(secs => %s))
+            ON CONFLICT (guild_id, user_id) DO UPDATE
+                SET token = EXCLUDED.token, command_name = EXCLUDED.command_name, expires_at = EXCLUDED.expires_at
+                WHERE command_sessions.expires_at < NOW()::timestamp
+            RETURNING token
+            """,
+            (guild_id or 0, user_id, token, command_name, ttl)
+        )
+        return token if rows else None
+
+    async def refresh(self, guild_id, user_id, token, ttl=SESSION_LOCK_TTL):
+        """Extends a held lock. Returns False if the lock was lost."""
+        rows = await async_fetch_query(
+            """
+            UPDATE command_sessions SET expires_at = NOW()::timestamp + make_interval(secs => %s)
+            WHERE guild_id = %s AND user_id = %s AND token = %s
+            RETURNING token
+            """,
+            (ttl, guild_id or 0, user_id, token)
+        )
+        return bool(rows)
+
+    async def release(self, guild_id, user_id, token):
+        """Releases a lock if it is still held with this token."""
+        await async_execute_query(
+            "DELETE FROM command_sessions WHERE guild_id = %s AND user_id = %s AND token = %s",
+            (guild_id or 0, user_id, token)
+        )
+
+
+SESSION_LOCK_BACKENDS = {
+    'memory': InProcessSessionLock,
+    'postgres': PostgresSessionLock,
+}
+
+# Multi-process deployments share locks through Postgres unless configured otherwise
+SESSION_LOCK_BACKEND = os.getenv("SESSION_LOCK_BACKEND", "postgres" if WORKER_PROCESSES > 1 else "memory")
+
+session_lock = SESSION_LOCK_BACKENDS[SESSION_LOCK_BACKEND]()
@@ -0,0 +1,84 @@
+# utils/sharding.py
+
+import os
+
+# Deployment settings, read from the environment:
+# - SHARD_COUNT: total number of gateway shards, or "auto" to let Discord recommend one.
+#   Unset runs a single unsharded bot.
+# - WORKER_PROCESSES: number of bot processes to launch; each owns a contiguous shard range.
+# - SHARD_IDS: the shard range of this process (e.g. "0-3"). Set by the supervisor for its workers.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+WORKER_PROCESSES = max(int(os.getenv("WORKER_PROCESSES", "1")), 1)
+SHARD_IDS = os.getenv("SHARD_IDS")
+
+# Total database connections across all processes; each process gets an equal share
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MIN_SIZE_PER_PROCESS = 2
+
+
+def parse_shard_ids(value):
+    """
+    Parses a shard range like "0-3" or a list like "0,2,4" into a list of shard IDs.
+    """
+    shard_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-')
+            shard_ids.extend(range(int(first), int(last) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+
+def shard_count():
+    """
+    Returns the configured shard count, or None when it is unset or "auto".
+    Multi-process mode needs a fixed count, so it defaults to one shard per process.
+    """
+    if SHARD_COUNT and SHARD_COUNT.lower() != 'auto':
+        return int(SHARD_COUNT)
+    if WORKER_PROCESSES > 1:
+        return WORKER_PROCESSES
+    return None
+
+
+def is_sharded():
+    """Returns True if this process should run an AutoShardedBot."""
+    return bool(SHARD_COUNT or SHARD_IDS or WORKER_PROCESSES > 1)
+
+
+def is_supervisor():
+    """Returns True if this process should launch worker processes instead of a bot."""
+    return WORKER_PROCESSES > 1 and not SHARD_IDS
+
+
+def local_shard_ids():
+    """Returns the shard IDs this process owns, or None for all of them."""
+    return parse_shard_ids(SHARD_IDS) if SHARD_IDS else None
+
+
+def worker_shard_ranges(total_shards, workers):
+    """
+    Splits shards 0..total_shards-1 into `workers` contiguous ranges of near-equal size.
+    Returns a list of (first, last) pairs, skipping empty ranges.
+    """
+    ranges = []
+    base, extra = divmod(total_shards, workers)
+    first = 0
+    for worker in range(workers):
+        size = base + (1 if worker < extra else 0)
+        if size:
+            ranges.append((first, first + size - 1))
+        first += size
+    return ranges
+
+
+def shard_for_guild(guild_id, total_shards):
+    """Returns the shard a guild is routed to (Discord's formula)."""
+    return (guild_id >> 22) % total_shards
+
+
+def pool_max_size():
+    """Returns this process's share of the database connection budget."""
+    return max(DB_POOL_MAX_SIZE // WORKER_PROCESSES, DB_POOL_MIN_SIZE_PER_PROCESS)
@@ -0,0 +1,219 @@
+# utils/wizard.py
+
+import logging
+import uuid
+import discord
+from psycopg.types.json import Jsonb
+from utils.db import async_fetch_query
+
+# Wizard buttons and modals carry their session in the custom_id:
+#   wiz:<session_id>:<action>:<value>
+# Session state lives in the `wizard_sessions` table, so a click is handled by loading the
+# session by ID; nothing waits in memory between steps and a restart loses nothing.
+CUSTOM_ID_PREFIX = "wiz"
+
+_handlers = {}  # kind -> async handler(interaction, session, action, value)
+_expiry_handlers = {}  # kind -> async on_expire(session)
+
+
+def register_wizard(kind, handler, on_expire=None):
+    """
+    Registers the step handler for a wizard kind. The handler is called as
+    `await handler(interaction, session, action, value)` for every click or modal
+    submit on that kind's sessions; `value` is a dict of field values for modals.
+    `on_expire(session)`, if given, is awaited once for each session that times out.
+    """
+    _handlers[kind] = handler
+    if on_expire is not None:
+        _expiry_handlers[kind] = on_expire
+
+
+async def create_session(kind, guild_id, user_id, step, state, ttl, channel_id=None):
+    """
+    Starts a wizard session that expires after `ttl` seconds. `channel_id` is where
+    its timeout notice is posted.
+    Returns the session ID, or None if the user already has a live wizard in this guild.
+    """
+    # An expired session would otherwise block the user until the next sweep
+    await expire_sessions([guild_id])
+
+    session_id = uuid.uuid4().hex
+    rows = await async_fetch_query(
+        """
+        INSERT INTO wizard_sessions (session_id, kind, guild_id, user_id, step, state, channel_id, expires_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, NOW()::timestamp + make_interval(secs => %s))
+        ON CONFLICT (guild_id, user_id) DO NOTHING
+        RETURNING session_id
+        """,
+        (session_id, kind, guild_id, user_id, step, Jsonb(state), channel_id, ttl)
+    )
+    return session_id if rows else None
+
+
+async def expire_sessions(guild_ids):
+    """
+    Deletes the expired sessions of the given guilds and runs each one's expiry handler.
+    Deleting with RETURNING claims each session, so a timeout is reported exactly once.
+    """
+    if not guild_ids:
+        return
+    expired = await async_fetch_query(
+        """
+        DELETE FROM wizard_sessions
+        WHERE expires_at < NOW()::timestamp AND guild_id = ANY(%s)
+        RETURNING session_id, kind, guild_id, user_id, step, state, channel_id
+        """,
+        (list(guild_ids),)
+    )
+    for session in expired:
+        on_expire = _expiry_handlers.get(session['kind'])
+        if on_expire is None:
+            continue
+        try:
+            await on_expire(session)
+        except Exception as e:
+            logging.error(f"Expiry handler failed for {session['kind']} session `{session['session_id']}`: {e}")
+
+
+async def load_session(session_id):
+    """Returns a live session as a dict, or None if it does not exist or has expired."""
+    rows = await async_fetch_query(
+        """
+        SELECT session_id, kind, guild_id, user_id, step, state FROM wizard_sessions
+        WHERE session_id = %s AND expires_at >= NOW()::timestamp
+        """,
+        (session_id,)
+    )
+    return rows[0] if rows else None
+
+
+async def advance_session(session, step, state=None, ttl=None):
+    """
+    Moves a session from its current step to `step`, optionally replacing its state and
+    resetting its expiry to `ttl` seconds from now. Returns False if another click already
+    moved the session on, in which case the caller should do nothing.
+    """
+    rows = await async_fetch_query(
+        """
+        UPDATE wizard_sessions
+        SET step = %s, state = COALESCE(%s, state),
+            expires_at = COALESCE(NOW()::timestamp + make_interval(secs => %s), expires_at)
+        WHERE session_id = %s AND step = %s
+        RETURNING session_id
+        """,
+        (step, Jsonb(state) if state is not None else None, ttl, session['session_id'], session['step'])
+    )
+    return bool(rows)
+
+
+async def add_to_session_list(session, key, item):
+    """
+    Atomically adds `item` to the list `state[key]` (if not already present) and returns
+    the updated state, so concurrent clicks from different users are never lost.
+    """
+    rows = await async_fetch_query(
+        """
+        UPDATE wizard_sessions
+        SET state = jsonb_set(
+            state, ARRAY[%s],
+            CASE WHEN COALESCE(state -> %s, '[]') @> to_jsonb(%s::bigint)
+                 THEN COALESCE(state -> %s, '[]')
+                 ELSE COALESCE(state -> %s, '[]') || to_jsonb(%s::bigint) END
+        )
+        WHERE session_id = %s AND step = %s
+        RETURNING state
+        """,
+        (key, key, item, key, key, item, session['session_id'], session['step'])
+    )
+    return rows[0]['state'] if rows else None
+
+
+async def end_session(session):
+    """
+    Deletes a session at its current step. Returns False if another click already ended
+    or advanced it, so only one click ever completes a wizard.
+    """
+    rows = await async_fetch_query(
+        "DELETE FROM wizard_sessions WHERE session_id = %s AND step = %s RETURNING session_id",
+        (session['session_id'], session['step'])
+    )
+    return bool(rows)
+
+
+def wizard_buttons(session_id, buttons):
+    """
+    Returns a view of wizard buttons. `buttons` is a list of (label, emoji, action, value)
+    tuples, with an optional fifth ButtonStyle. The view is stopped before it is sent, so
+    discord.py does not keep it in memory; clicks reach `dispatch_wizard` instead.
+    """
+    view = discord.ui.View(timeout=None)
+    for label, emoji, action, value, *style in buttons:
+        view.add_item(discord.ui.Button(
+            label=label,
+            emoji=emoji,
+            style=style[0] if style else discord.ButtonStyle.secondary,
+            custom_id=f"{CUSTOM_ID_PREFIX}:{session_id}:{action}:{value}",
+        ))
+    view.stop()
+    return view
+
+
+def wizard_modal(session_id, action, title, fields):
+    """
+    Returns a modal whose submission is routed to the wizard as `action`.
+    `fields` is a list of (field_id, label, max_length, placeholder) tuples.
+    Like the button views, the modal is stopped before it is sent, so discord.py does not
+    keep a dismissed one in memory; submissions reach `dispatch_wizard` instead.
+    """
+    modal = discord.ui.Modal(title=title, custom_id=f"{CUSTOM_ID_PREFIX}:{session_id}:{action}:", timeout=None)
+    for field_id, label, max_length, placeholder in fields:
+        modal.add_item(discord.ui.TextInput(
+            label=label, custom_id=field_id, max_length=max_length, placeholder=placeholder
+        ))
+    modal.stop()
+    return modal
+
+
+def _modal_values(data):
+    """Extracts {custom_id: value} from a modal submission payload."""
+    values = {}
+    for row in data.get('components', []):
+        for component in row.get('components', []):
+            values[component['custom_id']] = component.get('value', '')
+    return values
+
+
+async def dispatch_wizard(interaction: discord.Interaction):
+    """
+    Handles a wizard button click or modal submission by resuming its session.
+    Returns False if the interaction is not for a wizard.
+    """
+    if interaction.type not in (discord.InteractionType.component, discord.InteractionType.modal_submit):
+        return False
+    data = interaction.data or {}
+    custom_id = data.get('custom_id', '')
+    if not custom_id.startswith(f"{CUSTOM_ID_PREFIX}:"):
+        return False
+
+    try:
+        _, session_id, action, value = custom_id.split(':', 3)
+    except ValueError:
+        logging.warning(f"Ignoring malformed wizard custom_id: {custom_id}")
+        return False
+    if interaction.type == discord.InteractionType.modal_submit:
+        value = _modal_values(data)
+
+    session = await load_session(session_id)
+    if session is None:
+        await interaction.response.edit_message(
+            content="⏳ This session has expired. Please start again.", view=None
+        )
+        return True
+
+    handler = _handlers.get(session['kind'])
+    if handler is None:
+        logging.error(f"No wizard handler registered for session kind `{session['kind']}`.")
+        return False
+
+    await handler(interaction, session, action, value)
+    return True